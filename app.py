@@ -1,10 +1,20 @@
 import os
 import streamlit as st
-import pandas as pd
-import requests
 import random
-import re
-from io import StringIO
+import hashlib
+import time
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from catalogue import MovieCatalogue
+from imdb_ids import extract_imdb_ids
+from import_jobs import FAILED, RUNNING, discard_import_job, start_import_job
+from trailers import find_youtube_trailer
+from omdb_cache import (
+    FRESH_TTL_SECONDS, MemoryLRUCache, connect_cache_backends, memory_cache_max_items,
+    load_movie, run_import, schedule_refresh,
+)
+from omdb_quota import get_omdb_scheduler, quota_message
 
 try:
     from dotenv import load_dotenv
@@ -19,43 +29,84 @@ if not OMDB_API_KEY:
     st.error("❌ Geen OMDB_API_KEY gevonden. Stel deze in als environment variable.")
     st.stop()
 
-@st.cache_data(show_spinner=False)
-def extract_imdb_ids(df):
-    imdb_ids = set()
-    pattern = re.compile(r'(tt\d{7,8})')
-    for col in df.columns:
+# Dezelfde cachelagen als de OMDb-pagina en warm_cache.py (geheugen -> Redis -> SQLite -> OMDb)
+cache_status = connect_cache_backends()
+if cache_status["error"]:
+    st.error(f"❌ Fout bij initialiseren Upstash verbinding: {cache_status['error']}")
+
+@st.cache_resource
+def get_memory_cache():
+    return MemoryLRUCache(memory_cache_max_items(), FRESH_TTL_SECONDS)
+
+# Lazy modus: de volgende picks alvast op de achtergrond in de cachelagen zetten
+PREFETCH_AHEAD = int(os.getenv("PREFETCH_AHEAD", "3"))
+MAX_PICK_SKIPS = 10  # Titels zonder OMDb-data die een selectie hooguit overslaat
+
+@st.cache_resource
+def get_prefetcher():
+    return {"executor": ThreadPoolExecutor(max_workers=4), "pending": {}, "lock": threading.Lock()}
+
+def prefetch_movies(imdb_ids):
+    prefetcher = get_prefetcher()
+    with prefetcher["lock"]:
+        pending = prefetcher["pending"]
+        for imdb_id in [key for key, future in pending.items() if future.done()]:
+            del pending[imdb_id]
+        for imdb_id in imdb_ids:
+            if imdb_id not in pending:
+                pending[imdb_id] = prefetcher["executor"].submit(load_movie, imdb_id, get_memory_cache())
+
+def get_movie_for_pick(imdb_id):
+    """Wacht op een lopende prefetch in plaats van de titel dubbel op te halen"""
+    prefetcher = get_prefetcher()
+    with prefetcher["lock"]:
+        future = prefetcher["pending"].get(imdb_id)
+    if future is not None:
         try:
-            matches = df[col].astype(str).str.extractall(pattern)[0].unique()
-            for match in matches:
-                if pd.notna(match):
-                    imdb_ids.add(match)
-        except:
-            continue
-    return list(imdb_ids)
-
-@st.cache_data(show_spinner=True, ttl=3600)
-def get_movie_data(imdb_id):
-    try:
-        url = f"http://www.omdbapi.com/?i={imdb_id}&apikey={OMDB_API_KEY}&plot=full"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data if data.get('Response') == 'True' else {}
-    except:
-        return {}
-
-def find_youtube_trailer(title, year):
-    try:
-        query = f"{title} {year} official trailer site:youtube.com"
-        search_url = f"https://www.youtube.com/results?search_query={requests.utils.quote(query)}"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(search_url, headers=headers, timeout=15)
-        video_ids = re.findall(r'watch\?v=(\S{11})', response.text)
-        if video_ids:
-            return f"https://www.youtube.com/watch?v={video_ids[0]}"
-        return None
-    except:
-        return None
+            future.result()
+        except Exception:
+            pass
+    return load_movie(imdb_id, get_memory_cache())  # {} als de titel op het quotum wacht
+
+@st.cache_resource
+def get_catalogue():
+    """Proces-brede kolomgewijze catalogus (zie catalogue.py); sessies bewaren alleen rijnummers"""
+    return MovieCatalogue()
+
+MEDIA_TYPE_FILTERS = {"Alleen films": "movie", "Alleen series": "series"}
+
+IMPORT_POLL_SECONDS = 1
+
+def run_import_job(job, imdb_ids, import_key, memory_cache, catalogue):
+    """Werk van de import-job (zelfde import als de OMDb-pagina); geeft (rijnummers, rapport)"""
+    movies, report = run_import(imdb_ids, import_key, memory_cache, job.advance)
+    if report["stale_ids"]:
+        schedule_refresh(report["stale_ids"], memory_cache)
+    return catalogue.add_many(movies), report
+
+def import_catalogue(imdb_ids):
+    """Start de import-job voor deze lijst of haak in op de lopende; geeft (rijnummers, rapport) als hij klaar is"""
+    # Eigen sleutel: de rijnummers horen bij de catalogus van deze pagina
+    import_key = "app:" + hashlib.sha256("\n".join(imdb_ids).encode()).hexdigest()
+    memory_cache = get_memory_cache()
+    catalogue = get_catalogue()
+    job = start_import_job(
+        import_key, len(imdb_ids), lambda job: run_import_job(job, imdb_ids, import_key, memory_cache, catalogue)
+    )
+    if job.status == RUNNING:
+        done, total = job.progress()
+        st.progress(done / (total or 1), text=f"Titels ophalen en cachen: {done}/{total}")
+        time.sleep(IMPORT_POLL_SECONDS)
+        st.rerun()
+    if job.status == FAILED:
+        discard_import_job(import_key)
+        st.error(f"❌ Ophalen van de titels mislukt: {job.error}")
+        st.stop()
+    catalogue_rows, report = job.result
+    if report["deferred"] or report["failed"]:
+        discard_import_job(import_key)  # Onvolledig: een volgende load haalt de rest op
+    return catalogue_rows, report
+
 
 st.title("🎬 IMDb Random Picker")
 st.markdown("Upload een CSV-bestand met IMDb ID's (zoals `tt1234567`). Werkt met watchlists of elke CSV met IDs.")
@@ -67,86 +118,117 @@ uploaded_file = st.file_uploader("📤 Upload CSV-bestand", type=["csv"])
 
 if uploaded_file:
     try:
-        try:
-            df = pd.read_csv(uploaded_file)
-        except UnicodeDecodeError:
-            uploaded_file.seek(0)
-            content = uploaded_file.read().decode('latin-1')
-            df = pd.read_csv(StringIO(content))
-
-        imdb_ids = extract_imdb_ids(df)
+        # Scan de ruwe bytes; geen DataFrame en geen aparte latin-1 fallback nodig
+        imdb_ids = extract_imdb_ids(uploaded_file)
         if not imdb_ids:
             st.warning("⚠️ Geen IMDb ID's gevonden.")
             st.stop()
 
         st.success(f"✅ {len(imdb_ids)} IMDb ID's gevonden!")
         media_type = st.selectbox("📺 Wat wil je kijken?", ["Alles", "Alleen films", "Alleen series"])
+        lazy_mode = st.toggle("⚡ Snel starten (alleen de getoonde titels ophalen)", value=True)
 
-        # Laden van alle films via OMDb (basisdata)
-        rebuild = False
-        if "all_data" not in st.session_state:
-            rebuild = True
-        elif st.session_state.get("last_media_type") != media_type:
-            rebuild = True
-
-        if rebuild:
-            st.session_state.all_data = []
-            st.session_state.last_media_type = media_type
-            count = len(imdb_ids)
-            with st.spinner("Titels ophalen en cachen... Dit kan even duren bij grote lijsten."):
-                progress = st.progress(0)
-                for i, imdb_id in enumerate(imdb_ids):
-                    movie_data = get_movie_data(imdb_id)
-                    if not movie_data:
-                        progress.progress((i+1)/count)
-                        continue
-                    st.session_state.all_data.append((imdb_id, movie_data))
-                    progress.progress((i+1)/count)
-                progress.empty()
-
-            # Filter op media_type na ophalen
-            if media_type == "Alleen films":
-                st.session_state.all_data = [item for item in st.session_state.all_data if item[1].get("Type") == "movie"]
-            elif media_type == "Alleen series":
-                st.session_state.all_data = [item for item in st.session_state.all_data if item[1].get("Type") == "series"]
-
-        if not st.session_state.all_data:
-            st.warning("⚠️ Geen titels gevonden met dat type.")
-            st.stop()
+        if "favorites" not in st.session_state:
+            st.session_state.favorites = []  # Alleen IMDb ID's; de data staat in de cache
 
-        if "last_selected_idx" not in st.session_state or st.session_state.last_selected_idx >= len(st.session_state.all_data):
-            st.session_state.last_selected_idx = random.randrange(len(st.session_state.all_data))
+        # Bij 'Alles' in lazy modus hoeft de hele lijst niet eerst verrijkt te worden
+        catalogue = get_catalogue()
+        catalogue_ready = "catalogue_rows" in st.session_state and st.session_state.get("last_imdb_ids") == imdb_ids
+        if lazy_mode and media_type == "Alles" and not catalogue_ready:
+            if st.session_state.get("lazy_imdb_ids") != imdb_ids or "next_picks" not in st.session_state:
+                st.session_state.lazy_imdb_ids = imdb_ids
+                st.session_state.next_picks = [random.choice(imdb_ids) for _ in range(PREFETCH_AHEAD + 1)]
 
-        if st.button("🔁 Nieuwe selectie", type="primary"):
-            total = len(st.session_state.all_data)
-            if total == 1:
-                st.info("Er is maar één titel beschikbaar — kan niet wisselen.")
-            else:
-                new_idx = random.randrange(total)
-                tries = 0
-                while new_idx == st.session_state.last_selected_idx and tries < 10:
-                    new_idx = random.randrange(total)
+            if st.button("🔁 Nieuwe selectie", type="primary") and len(imdb_ids) > 1:
+                st.session_state.next_picks.pop(0)
+
+            # Eerste titel met OMDb-data tonen; ID's zonder data worden overgeslagen
+            movie = {}
+            tries = 0
+            scheduler = get_omdb_scheduler(OMDB_API_KEY)
+            while not movie and tries <= MAX_PICK_SKIPS:
+                if tries and scheduler.stats()["remaining"] == 0:
+                    break  # Quotum op: verder zoeken kost alleen nog uitgestelde calls
+                while len(st.session_state.next_picks) < PREFETCH_AHEAD + 1:
+                    st.session_state.next_picks.append(random.choice(imdb_ids))
+                chosen_id = st.session_state.next_picks[0]
+                movie = get_movie_for_pick(chosen_id)
+                if not movie:
+                    st.session_state.next_picks.pop(0)
                     tries += 1
-                if new_idx == st.session_state.last_selected_idx:
-                    new_idx = (st.session_state.last_selected_idx + 1) % total
-                st.session_state.last_selected_idx = new_idx
+            if not movie:
+                if scheduler.stats()["remaining"] == 0:
+                    st.warning(quota_message(OMDB_API_KEY))
+                else:
+                    st.warning("⚠️ Geen titels gevonden via OMDb; probeer een nieuwe selectie.")
+                st.stop()
+            prefetch_movies(st.session_state.next_picks[1:])
+        else:
+            # Laden van alle films via OMDb (basisdata), één keer per lijst en los van het filter
+            # De sessie houdt alleen rijnummers vast; de kolommen staan in de gedeelde catalogus
+            if not catalogue_ready:
+                st.session_state.pop("last_media_type", None)
+                st.session_state.catalogue_rows, report = import_catalogue(imdb_ids)
+                if report["deferred"]:
+                    st.warning(quota_message(OMDB_API_KEY, report["deferred"]))
+                if report["failed"]:
+                    st.warning(f"⚠️ {report['failed']} titels konden niet opgehaald worden; een volgende load probeert ze opnieuw.")
+                if report["deferred"] or report["failed"]:
+                    # Niet als klaar markeren: een volgende run haalt de ontbrekende titels alsnog op
+                    st.session_state.pop("last_imdb_ids", None)
+                else:
+                    st.session_state.last_imdb_ids = imdb_ids
 
-        if "favorites" not in st.session_state:
-            st.session_state.favorites = []
+            # Filter op media_type als index-view over de reeds opgehaalde data (geen netwerkverkeer)
+            if st.session_state.get("last_media_type") != media_type:
+                st.session_state.last_media_type = media_type
+                wanted_type = MEDIA_TYPE_FILTERS.get(media_type)
+                if wanted_type is None:
+                    st.session_state.view_indices = array('I', st.session_state.catalogue_rows)
+                else:
+                    st.session_state.view_indices = catalogue.rows_of_type(st.session_state.catalogue_rows, wanted_type)
+                st.session_state.pop("last_selected_idx", None)
+
+            view_indices = st.session_state.view_indices
+            if not view_indices:
+                st.warning("⚠️ Geen titels gevonden met dat type.")
+                st.stop()
+
+            if "last_selected_idx" not in st.session_state:
+                st.session_state.last_selected_idx = random.choice(view_indices)
+
+            if st.button("🔁 Nieuwe selectie", type="primary"):
+                total = len(view_indices)
+                if total == 1:
+                    st.info("Er is maar één titel beschikbaar — kan niet wisselen.")
+                else:
+                    new_idx = random.choice(view_indices)
+                    tries = 0
+                    while new_idx == st.session_state.last_selected_idx and tries < 10:
+                        new_idx = random.choice(view_indices)
+                        tries += 1
+                    if new_idx == st.session_state.last_selected_idx:
+                        position = view_indices.index(st.session_state.last_selected_idx)
+                        new_idx = view_indices[(position + 1) % total]
+                    st.session_state.last_selected_idx = new_idx
 
-        # Toon selectie
-        chosen_id, movie = st.session_state.all_data[st.session_state.last_selected_idx]
+            # Toon selectie: de volledige record komt uit de cache, niet uit de sessie
+            chosen_id = catalogue.imdb_id(st.session_state.last_selected_idx)
+            movie = get_movie_for_pick(chosen_id)
+            if not movie:
+                st.warning("⚠️ Deze titel kon niet geladen worden; probeer een nieuwe selectie.")
+                st.stop()
 
-        # Pas trailer laden uit bij selectie (live ophalen)
-        trailer_url = find_youtube_trailer(movie.get('Title'), movie.get('Year'))
+        # Trailer bij selectie ophalen (permanent gecachet op IMDb ID)
+        trailer_url = find_youtube_trailer(movie.get('Title'), movie.get('Year'), chosen_id)
 
         col_title, col_button = st.columns([3, 1])
         with col_title:
             st.subheader(f"{movie.get('Title', 'Onbekende titel')} ({movie.get('Year', '?')})")
         with col_button:
             if st.button("❤️ Voeg toe aan favorieten"):
-                if chosen_id not in [fav[0] for fav in st.session_state.favorites]:
-                    st.session_state.favorites.append((chosen_id, movie))
+                if chosen_id not in st.session_state.favorites:
+                    st.session_state.favorites.append(chosen_id)
 
         col1, col2 = st.columns([1, 2])
         with col1:
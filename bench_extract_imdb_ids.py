@@ -0,0 +1,76 @@
+import random
+import re
+import sys
+import time
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+from imdb_ids import extract_imdb_ids
+
+# Benchmark: streaming byte-extractor vs. de oude DataFrame-varianten
+# Gebruik: python bench_extract_imdb_ids.py [aantal_rijen]
+
+
+def extract_imdb_ids_findall(df):
+    """Oude pages/omdb.py-variant: findall per cel"""
+    imdb_ids = set()
+    pattern = re.compile(r'(tt\d{7,10})')
+    for col in df.columns:
+        try:
+            for cell in df[col].astype(str):
+                for match in pattern.findall(cell):
+                    imdb_ids.add(match)
+        except Exception:
+            continue
+    return list(imdb_ids)
+
+
+def extract_imdb_ids_extractall(df):
+    """Oude app.py/pages/tmdb.py-variant: extractall per kolom"""
+    imdb_ids = set()
+    pattern = re.compile(r'(tt\d{7,8})')
+    for col in df.columns:
+        try:
+            matches = df[col].astype(str).str.extractall(pattern)[0].unique()
+            for match in matches:
+                if pd.notna(match):
+                    imdb_ids.add(match)
+        except Exception:
+            continue
+    return list(imdb_ids)
+
+
+def read_csv(data):
+    try:
+        return pd.read_csv(BytesIO(data))
+    except UnicodeDecodeError:
+        return pd.read_csv(StringIO(data.decode('latin-1')))
+
+
+def make_csv(rows):
+    lines = ["Const,Your Rating,Date Rated,Title,URL,Title Type,Year"]
+    for i in range(rows):
+        imdb_id = f"tt{random.randint(100000, 99999999):07d}"
+        lines.append(
+            f"{imdb_id},{random.randint(1, 10)},2024-01-01,Titel {i} é,"
+            f"https://www.imdb.com/title/{imdb_id}/,Movie,{random.randint(1920, 2025)}"
+        )
+    return "\n".join(lines).encode("latin-1")
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {time.perf_counter() - start:8.3f}s  ({len(result)} ID's)")
+    return result
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    data = make_csv(rows)
+    print(f"{rows} rijen, {len(data) / 1024 / 1024:.1f} MiB")
+    streamed = timed("streaming bytes (imdb_ids.py)", lambda: extract_imdb_ids(BytesIO(data)))
+    findall = timed("read_csv + findall per cel", lambda: extract_imdb_ids_findall(read_csv(data)))
+    timed("read_csv + extractall per kolom", lambda: extract_imdb_ids_extractall(read_csv(data)))
+    assert set(streamed) == set(findall)
@@ -0,0 +1,61 @@
+import json
+import sys
+import time
+
+from movie_records import decode_movie, encode_movie
+
+# Micro-benchmark: grootte van de compacte cache-records vs. de volledige OMDb JSON
+# Gebruik: python bench_movie_records.py [omdb_response.json ...]
+# Zonder bestanden wordt een synthetisch OMDb-antwoord gebruikt.
+
+ROUNDS = 10000
+
+
+def synthetic_movie():
+    return {
+        "Title": "The Shawshank Redemption", "Year": "1994", "Rated": "R", "Released": "14 Oct 1994",
+        "Runtime": "142 min", "Genre": "Drama", "Director": "Frank Darabont",
+        "Writer": "Stephen King, Frank Darabont", "Actors": "Tim Robbins, Morgan Freeman, Bob Gunton",
+        "Plot": "Over the course of several years, two convicts form a friendship, seeking consolation and, "
+                "eventually, redemption through basic compassion. " * 3,
+        "Language": "English", "Country": "United States",
+        "Awards": "Nominated for 7 Oscars. 21 wins & 42 nominations total",
+        "Poster": "https://m.media-amazon.com/images/M/MV5BMDAyY2FhYjctNDc5OS00MDNlLThiMGUtY2UxYWVkNGY2ZjljXkEyXkFqcGc@._V1_SX300.jpg",
+        "Ratings": [
+            {"Source": "Internet Movie Database", "Value": "9.3/10"},
+            {"Source": "Rotten Tomatoes", "Value": "89%"},
+            {"Source": "Metacritic", "Value": "82/100"},
+        ],
+        "Metascore": "82", "imdbRating": "9.3", "imdbVotes": "3,012,345", "imdbID": "tt0111161",
+        "Type": "movie", "DVD": "N/A", "BoxOffice": "$28,767,189", "Production": "N/A",
+        "Website": "N/A", "Response": "True",
+    }
+
+
+def bench(label, function):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed / ROUNDS * 1e6:8.1f} µs per record")
+
+
+def main(paths):
+    movies = []
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            movies.append((path, json.load(handle)))
+    if not movies:
+        movies.append(("synthetisch", synthetic_movie()))
+
+    for name, movie in movies:
+        legacy = json.dumps(movie)
+        compact = encode_movie(movie)
+        print(f"{name}: {len(legacy)} -> {len(compact)} bytes ({len(compact) / len(legacy):.0%})")
+        bench("encode", lambda: encode_movie(movie))
+        bench("decode", lambda: decode_movie(compact))
+        bench("json", lambda: json.loads(legacy))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
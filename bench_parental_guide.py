@@ -0,0 +1,86 @@
+import glob
+import os
+import re
+import sys
+import time
+
+from parental_guide import extract_sex_nudity_rating
+
+# Micro-benchmark: parental_guide.extract_sex_nudity_rating vs. de oude regex-cascade
+# Gebruik: python bench_parental_guide.py [opgeslagen_parentalguide.html ...]
+# Zonder bestanden worden de pagina's uit bench_fixtures/ gebruikt: ingebedde JSON,
+# gerenderde labels en de oude tekstsectie (ingekort tot ~100 KB, met dezelfde opbouw
+# als de IMDb-pagina's). Met --synthetisch een kunstmatige pagina van ~1 MB.
+
+ROUNDS = 50
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures", "parentalguide_*.html")
+
+
+def extract_with_regex_cascade(html):
+    """Oude pages/omdb.py-variant, zonder de HTTP-request"""
+    raw_match1 = re.search(r'"advisoryCategory"\s*:\s*"SEX_AND_NUDITY".*?"text"\s*:\s*"([A-Za-z]+)"', html, re.DOTALL)
+    if raw_match1:
+        return raw_match1.group(1).strip().capitalize()
+
+    raw_match2 = re.search(r'"id"\s*:\s*"SEX_AND_NUDITY".*?"severity"\s*:\s*"([A-Za-z]+)"', html, re.DOTALL)
+    if raw_match2:
+        return raw_match2.group(1).strip().capitalize()
+
+    patterns = [
+        r'data-testid="advisory-severity-item-SEX_AND_NUDITY"[^>]*>\s*<span[^>]*>(Mild|Moderate|Severe|None)</span',
+        r'Sex & Nudity</h4>[^>]*>\s*<span[^>]*>(.*?)</span',
+        r'Sex & Nudity</h4>[^>]*>(.*?)</div',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+        if match:
+            res = match.group(1).strip().capitalize()
+            if res in ['Mild', 'Moderate', 'Severe', 'None']:
+                return res
+
+    if "Sex & Nudity" in html:
+        sex_section = html.split("Sex & Nudity")[1][:1200]
+        for level in ['Severe', 'Moderate', 'Mild', 'None']:
+            if level.lower() in sex_section.lower():
+                return level
+
+    return "Onbekend"
+
+
+def synthetic_page():
+    filler = '<div class="ipc-html-content">' + "lorem ipsum dolor sit amet " * 20000 + "</div>"
+    categories = ",".join(
+        f'{{"category":{{"id":"{category}","text":"{text}"}},'
+        f'"severity":{{"id":"{level.upper()}","text":"{level}"}},"items":[{"{}"}]}}'
+        for category, text, level in [
+            ("VIOLENCE", "Violence & Gore", "Severe"),
+            ("PROFANITY", "Profanity", "Mild"),
+            ("SEX_AND_NUDITY", "Sex & Nudity", "Moderate"),
+        ]
+    )
+    next_data = '{"props":{"pageProps":{"contentData":{"categories":[' + categories + ']}}}}'
+    return (
+        "<html><head></head><body>" + filler
+        + '<script id="__NEXT_DATA__" type="application/json">' + next_data + "</script>"
+        + filler + "</body></html>"
+    )
+
+
+def timed(label, fn, html):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(html)
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"  {label:<20} {elapsed:8.3f} ms/pagina  -> {result}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--synthetisch"]:
+        pages = [("synthetisch", synthetic_page())]
+    else:
+        paths = sys.argv[1:] or sorted(glob.glob(FIXTURES))
+        pages = [(path, open(path, encoding="utf-8", errors="replace").read()) for path in paths]
+    for name, html in pages:
+        print(f"{os.path.basename(name)} ({len(html) / 1024:.0f} KB)")
+        timed("regex-cascade", extract_with_regex_cascade, html)
+        timed("parental_guide", extract_sex_nudity_rating, html)
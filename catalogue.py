@@ -0,0 +1,114 @@
+import math
+import re
+import sys
+import threading
+from array import array
+
+# ------------------------------
+# 🗃️ Compacte, kolomgewijze catalogus (gedeeld door alle sessies)
+# ------------------------------
+# Eén rij per IMDb ID, over alle uploads en sessies heen. Alleen wat de filters nodig
+# hebben staat erin, als getypeerde kolommen: Type en Genre als categorie-codes, jaar
+# en ratings als getallen, ID's als geïnternde strings. De volledige OMDb-record voor
+# de kaart komt uit de geheugencache (of Redis/SQLite) op het moment dat hij getoond wordt.
+# Een sessie bewaart alleen een array met rijnummers.
+
+NO_YEAR = 0
+NO_RT_SCORE = -1
+YEAR_PATTERN = re.compile(r'\d{4}')
+
+
+def parse_year(value):
+    match = YEAR_PATTERN.search(value or "")
+    return int(match.group()) if match else NO_YEAR
+
+
+def parse_imdb_rating(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_rt_score(ratings):
+    for rate in ratings or []:
+        if rate.get("Source") == "Rotten Tomatoes":
+            try:
+                return int(rate.get("Value", "").rstrip("%"))
+            except ValueError:
+                return NO_RT_SCORE
+    return NO_RT_SCORE
+
+
+class Categories:
+    """Categorische kolom: elke waarde één keer opgeslagen, per rij alleen een code"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        value = value or ""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(sys.intern(value))
+            self.codes[value] = code
+        return code
+
+
+class MovieCatalogue:
+    """Thread-safe kolomopslag voor OMDb-titels, met rijnummers als stabiele verwijzing"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.row_of = {}
+        self.imdb_ids = []
+        self.type_categories = Categories()
+        self.genre_categories = Categories()
+        self.types = array('H')
+        self.genres = array('I')
+        self.years = array('H')
+        self.imdb_ratings = array('f')
+        self.rt_scores = array('b')
+
+    def __len__(self):
+        return len(self.imdb_ids)
+
+    def _add(self, imdb_id, movie):
+        values = (
+            self.type_categories.code(movie.get("Type")),
+            self.genre_categories.code(movie.get("Genre")),
+            parse_year(movie.get("Year")),
+            parse_imdb_rating(movie.get("imdbRating")),
+            parse_rt_score(movie.get("Ratings")),
+        )
+        columns = (self.types, self.genres, self.years, self.imdb_ratings, self.rt_scores)
+        row = self.row_of.get(imdb_id)
+        if row is None:
+            row = len(self.imdb_ids)
+            self.row_of[imdb_id] = row
+            self.imdb_ids.append(sys.intern(imdb_id))
+            for column, value in zip(columns, values):
+                column.append(value)
+        else:
+            # Titel opnieuw verrijkt: de bestaande rij bijwerken zodat verwijzingen geldig blijven
+            for column, value in zip(columns, values):
+                column[row] = value
+        return row
+
+    def add_many(self, movies):
+        """Voeg [(imdb_id, omdb_data)] toe; geeft de rijnummers in dezelfde volgorde terug"""
+        with self.lock:
+            return array('I', [self._add(imdb_id, movie) for imdb_id, movie in movies])
+
+    def imdb_id(self, row):
+        return self.imdb_ids[row]
+
+    def rows_of_type(self, rows, media_type):
+        """De rijen uit `rows` met het gegeven OMDb Type (bv. "movie" of "series")"""
+        code = self.type_categories.codes.get(media_type)
+        if code is None:
+            return array('I')
+        types = self.types
+        return array('I', [row for row in rows if types[row] == code])
@@ -0,0 +1,224 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from http_client import host_limit, http_pool_size, limited_get
+from omdb_quota import PRIORITY_BULK, QuotaExceeded, omdb_get
+from trailers import remember_trailer, trailer_from_tmdb_videos
+
+# ------------------------------
+# ⚙️ Async verrijkingspipeline (OMDb + TMDb)
+# ------------------------------
+# Alle stappen per titel worden als taken over de hele watchlist ingepland, met een
+# eigen concurrency-limiet per API. De HTTP-calls zelf lopen via de gedeelde,
+# gepoolde sessies uit http_client (in worker-threads via asyncio.to_thread), zodat
+# retry/backoff en keep-alive behouden blijven zonder extra dependency. Elke call
+# neemt de proces-brede semafoor van zijn host (limited_get): gelijktijdige imports,
+# prefetch en verversen blijven samen binnen host_limit.
+# De resultaten zijn exact de dicts die de pagina's vandaag renderen.
+
+OMDB_URL = "http://www.omdbapi.com/"
+TMDB_URL = "https://api.themoviedb.org/3"
+
+def api_concurrency():
+    """Limiet per API, bij gebruik gelezen (na load_dotenv).
+
+    Per pipeline niet meer taken tegelijk dan de host toelaat (host_limit in http_client),
+    zodat er geen threads staan te wachten op de semafoor van de host.
+    """
+    return {
+        "omdb": host_limit(urlparse(OMDB_URL).netloc),
+        "tmdb": host_limit(urlparse(TMDB_URL).netloc),
+        "scrapers": min(int(os.getenv("SCRAPER_CONCURRENCY", "4")), http_pool_size()),  # Extra's in warm_cache.py
+    }
+
+
+def omdb_api_key():
+    return os.getenv("OMDB_API_KEY")
+
+
+def tmdb_api_key():
+    return os.getenv("TMDB_API_KEY")
+
+
+# ---------- Pure helpers (ook gebruikt door de pagina's) ----------
+
+def patch_dutch_plot(data_en, data_nl):
+    """Vervang het Engelse plot door het Nederlandse als OMDb er een heeft"""
+    if data_nl and data_nl.get('Response') == 'True' and data_nl.get('Plot') and data_nl.get('Plot') != 'N/A':
+        data_en['Plot'] = data_nl['Plot']
+    return data_en
+
+
+def rt_score_from_omdb(omdb_data):
+    for rate in (omdb_data or {}).get("Ratings", []):
+        if rate.get("Source") == "Rotten Tomatoes":
+            return rate.get("Value")
+    return None
+
+
+def pick_find_result(data):
+    """(movie, type) uit een TMDb /find-antwoord, of (None, None)"""
+    if data.get("movie_results"):
+        return data["movie_results"][0], "movie"
+    if data.get("tv_results"):
+        return data["tv_results"][0], "series"
+    return None, None
+
+
+def build_tmdb_result(imdb_id, movie, movie_type, details):
+    """Het result-dict dat pages/tmdb.py rendert"""
+    director = "Onbekend"
+    cast = "Onbekend"
+
+    if movie_type == "movie":
+        # Voor films: regisseur zoeken in crew
+        crew = details.get("credits", {}).get("crew", [])
+        directors = [person for person in crew if person.get("job") == "Director"]
+        if directors:
+            director = directors[0].get("name", "Onbekend")
+    else:  # series
+        # Voor series: creator zoeken
+        creators = details.get("created_by", [])
+        if creators:
+            director = creators[0].get("name", "Onbekend")
+
+    cast_members = details.get("credits", {}).get("cast", [])[:5]  # Top 5 acteurs
+    if cast_members:
+        cast = ", ".join([actor.get("name", "") for actor in cast_members if actor.get("name")])
+
+    return {
+        "imdb_id": imdb_id,
+        "tmdb_id": movie["id"],
+        "type": movie_type,
+        "title": movie.get("title") or movie.get("name"),
+        "year": (movie.get("release_date") or movie.get("first_air_date") or "")[:4],
+        "runtime": details.get("runtime") or (details.get("episode_run_time", [0])[0] if details.get("episode_run_time") else 0),
+        "genres": ", ".join([g["name"] for g in details.get("genres", [])]),
+        "overview": movie.get("overview") or details.get("overview") or "Geen beschrijving",
+        "poster": f"https://image.tmdb.org/t/p/w300{movie['poster_path']}" if movie.get("poster_path") else None,
+        "rating_tmdb": details.get("vote_average", "N/A"),
+        "director": director,
+        "cast": cast,
+        "rt_score": None,  # vullen via OMDb als key beschikbaar
+        "videos": details.get("videos", {}).get("results", [])
+    }
+
+
+# ---------- Async stappen ----------
+
+async def get_json(limits, api, url, params=None, raise_for_status=True):
+    """GET onder de concurrency-limiet van de API; geeft de JSON terug of {} bij een niet-200.
+
+    OMDb-calls gaan via de quotum-scheduler (prioriteit bulk) en kunnen QuotaExceeded geven.
+    """
+    async with limits[api]:
+        if api == "omdb":
+            response = await asyncio.to_thread(omdb_get, url, PRIORITY_BULK, getter=limited_get, params=params)
+        else:
+            response = await asyncio.to_thread(limited_get, url, params=params)
+    if raise_for_status:
+        response.raise_for_status()
+    elif response.status_code != 200:
+        return {}
+    return response.json()
+
+
+async def enrich_omdb_title(imdb_id, limits):
+    """Zelfde dict als get_movie_data_uncached: Engelse data met Nederlands plot.
+
+    De NL-call volgt pas als de EN-call een titel vond, zodat een onbekend ID maar één
+    OMDb-call kost. Bij Response False komt het OMDb-antwoord zelf terug (voor de negatieve cache).
+    """
+    params = {"i": imdb_id, "apikey": omdb_api_key(), "plot": "full"}
+    data_en = await get_json(limits, "omdb", OMDB_URL, params)
+    if data_en.get('Response') != 'True':
+        return data_en
+    try:
+        data_nl = await get_json(limits, "omdb", OMDB_URL, {**params, "language": "nl"}, raise_for_status=False)
+    except QuotaExceeded:
+        data_nl = None  # Engelse data is binnen: niet uitstellen voor alleen het plot
+    except Exception as e:
+        print(f"NL plot mislukt voor {imdb_id}: {e}")
+        data_nl = None
+    return patch_dutch_plot(data_en, data_nl)
+
+
+async def enrich_tmdb_title(imdb_id, limits):
+    """Zelfde dict als pages/tmdb.py: /find en de OMDb-call voor Rotten Tomatoes lopen parallel.
+
+    Kon de RT-score niet opgehaald worden (quotum of fout), dan staat rt_pending op True.
+    """
+    find_params = {"api_key": tmdb_api_key(), "external_source": "imdb_id"}
+    tasks = [get_json(limits, "tmdb", f"{TMDB_URL}/find/{imdb_id}", find_params)]
+    if omdb_api_key():
+        tasks.append(get_json(limits, "omdb", OMDB_URL, {"i": imdb_id, "apikey": omdb_api_key()}, raise_for_status=False))
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    found = responses[0]
+    omdb_data = responses[1] if len(responses) > 1 else {}
+    if isinstance(found, Exception):
+        raise found
+
+    movie, movie_type = pick_find_result(found)
+    if movie is None:
+        return {}
+    details_params = {"api_key": tmdb_api_key(), "append_to_response": "videos,external_ids,credits"}
+    details = await get_json(limits, "tmdb", f"{TMDB_URL}/{movie_type}/{movie['id']}", details_params)
+
+    result = build_tmdb_result(imdb_id, movie, movie_type, details)
+    if isinstance(omdb_data, Exception):
+        # RT uitgesteld (OMDb-quotum) of mislukt: wel tonen, maar niet cachen (tmdb_cache.py)
+        result["rt_pending"] = True
+    else:
+        result["rt_score"] = rt_score_from_omdb(omdb_data)
+    # TMDb-trailer delen met de andere pagina's (trailer-cache op IMDb ID)
+    remember_trailer(trailer_from_tmdb_videos(result["videos"]), imdb_id=imdb_id)
+    return result
+
+
+ENRICHERS = {"omdb": enrich_omdb_title, "tmdb": enrich_tmdb_title}
+
+
+async def enrich_titles(imdb_ids, source="omdb", on_result=None, retry_errors=False):
+    """Verrijk alle ID's parallel; geeft een lijst in invoervolgorde terug ({} bij geen data of een fout).
+
+    Titels die wachten op het OMDb-dagquotum krijgen None (uitgesteld, niet cachen). Met
+    retry_errors krijgt een mislukte titel ook None in plaats van {}, zodat {} alleen
+    "niet gevonden" betekent.
+    on_result(index, imdb_id, data) wordt aangeroepen zodra een titel klaar is, in de
+    thread die de event loop draait (dus veilig voor st.progress).
+    """
+    concurrency = api_concurrency()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(concurrency.values()) + 4))
+    limits = {api: asyncio.Semaphore(max(1, limit)) for api, limit in concurrency.items()}
+    enrich = ENRICHERS[source]
+    results = [{} for _ in imdb_ids]
+
+    async def run(index, imdb_id):
+        try:
+            data = await enrich(imdb_id, limits)
+        except QuotaExceeded:
+            data = None
+        except Exception as e:
+            print(f"Verrijking mislukt voor {imdb_id} ({source}): {e}")
+            data = None if retry_errors else {}
+        results[index] = data
+        if on_result:
+            on_result(index, imdb_id, data)
+
+    await asyncio.gather(*(run(i, imdb_id) for i, imdb_id in enumerate(imdb_ids)))
+    return results
+
+
+def run_enrichment(imdb_ids, source="omdb", on_result=None, retry_errors=False):
+    """Synchrone wrapper voor Streamlit (en de CLI) rond enrich_titles"""
+    coroutine = enrich_titles(imdb_ids, source, on_result, retry_errors)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Er draait al een event loop in deze thread: voer de pipeline in een eigen thread uit
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -0,0 +1,118 @@
+import os
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ------------------------------
+# 🌐 Gedeelde HTTP-client per upstream host
+# ------------------------------
+# Eén requests.Session per host voor het hele proces: keep-alive en een connection
+# pool die groot genoeg is voor de worker-threads, zodat bulk-imports niet per titel
+# een nieuwe TCP+TLS-handshake betalen. Modules blijven over Streamlit reruns heen
+# geladen, dus deze registry werkt als een st.cache_resource die ook buiten
+# Streamlit (CLI) bruikbaar is.
+
+# Eén knop per host: geldt voor het hele proces (imports, prefetch, verversen en de CLI samen)
+HOST_CONCURRENCY_ENV = {
+    "www.omdbapi.com": ("OMDB_CONCURRENCY", "8"),
+    "api.themoviedb.org": ("TMDB_CONCURRENCY", "16"),
+}
+HTTP_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+DEFAULT_TIMEOUT = 10
+HOST_TIMEOUTS = {
+    "www.omdbapi.com": 10,
+    "api.themoviedb.org": 10,
+    "image.tmdb.org": 10,
+    "www.imdb.com": 12,
+    "www.youtube.com": 15,
+}
+
+
+# De knoppen worden pas bij gebruik gelezen, zodat load_dotenv() ná de imports nog meetelt
+def http_pool_size():
+    """Connection pool per host; begrenst ook host_limit()"""
+    return int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+
+def http_max_retries():
+    return int(os.getenv("HTTP_MAX_RETRIES", "3"))
+
+
+def max_requests_per_host():
+    """Limiet voor hosts zonder eigen knop in HOST_CONCURRENCY_ENV"""
+    return int(os.getenv("MAX_REQUESTS_PER_HOST", "4"))
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry met willekeurige jitter op de exponentiële backoff"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff * random.uniform(0.5, 1.5) if backoff else 0
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_host_semaphores = {}
+
+
+def build_session():
+    session = requests.Session()
+    retry = JitteredRetry(
+        total=http_max_retries(),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=http_pool_size(), max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(host):
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = build_session()
+            _sessions[host] = session
+        return session
+
+
+def host_limit(host):
+    """Maximum aantal gelijktijdige requests naar een host; nooit boven de connection pool"""
+    if host in HOST_CONCURRENCY_ENV:
+        limit = int(os.getenv(*HOST_CONCURRENCY_ENV[host]))
+    else:
+        limit = max_requests_per_host()
+    return max(1, min(limit, http_pool_size()))
+
+
+def host_semaphore(host):
+    """Proces-brede semafoor die het aantal gelijktijdige requests naar één host begrenst"""
+    with _sessions_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(host_limit(host))
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+
+def http_get(url, **kwargs):
+    """requests.get via de gedeelde sessie van de host, met de timeout van die host als standaard"""
+    host = urlparse(url).netloc
+    kwargs.setdefault("timeout", HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT))
+    return get_session(host).get(url, **kwargs)
+
+
+def limited_get(url, **kwargs):
+    """http_get binnen de proces-brede limiet van de host (host_limit)"""
+    with host_semaphore(urlparse(url).netloc):
+        return http_get(url, **kwargs)
@@ -0,0 +1,35 @@
+import codecs
+from http_client import http_get
+
+# ------------------------------
+# 🌊 Gestreamde HTML-reads met vroegtijdige stop
+# ------------------------------
+# Scrapers hebben maar één stukje van een pagina nodig. We lezen de response in
+# blokken, houden een begrensde rollende buffer bij en sluiten de verbinding zodra
+# het antwoord gevonden is of het byte-budget op is.
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def scan_stream(url, scan, max_bytes, keep_chars, **request_kwargs):
+    """Roep scan(buffer, eof) aan per ontvangen blok; stopt bij het eerste resultaat dat niet None is.
+
+    De buffer bevat hooguit de laatste `keep_chars` tekens plus het nieuwe blok. Bij het
+    einde van de response (of van het budget) volgt nog één aanroep met eof=True.
+    """
+    with http_get(url, stream=True, **request_kwargs) as response:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        buffer = ""
+        received = 0
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            received += len(chunk)
+            buffer += decoder.decode(chunk)
+            result = scan(buffer, False)
+            if result is not None:
+                return result
+            if received >= max_bytes:
+                break
+            if len(buffer) > keep_chars:
+                buffer = buffer[-keep_chars:]
+        return scan(buffer + decoder.decode(b"", final=True), True)
@@ -0,0 +1,49 @@
+import re
+
+# ------------------------------
+# 🔎 Extract IMDb IDs (streaming, rechtstreeks op de ruwe bytes)
+# ------------------------------
+# IMDb ID's zijn puur ASCII, dus ze zien er in UTF-8 en latin-1 identiek uit:
+# we hoeven het bestand niet te decoderen of als DataFrame te parsen.
+
+IMDB_ID_PATTERN = re.compile(rb'tt\d{7,10}')
+# Langst mogelijke match: "tt" + 10 cijfers
+MAX_ID_LENGTH = 12
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_chunks(source, chunk_size=READ_CHUNK_SIZE):
+    """Levert blokken bytes uit bytes/bytearray of een (binair) bestandsobject"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = memoryview(source)
+        for start in range(0, len(data), chunk_size):
+            yield bytes(data[start:start + chunk_size])
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode("latin-1", errors="ignore")
+        yield chunk
+
+
+def extract_imdb_ids(source, chunk_size=READ_CHUNK_SIZE):
+    """Unieke IMDb ID's in volgorde van eerste voorkomen, zonder het hele bestand te parsen"""
+    seen = {}
+    carry = b""
+    for chunk in iter_chunks(source, chunk_size):
+        buffer = carry + chunk
+        # Matches die in de laatste MAX_ID_LENGTH bytes beginnen kunnen nog doorlopen in
+        # het volgende blok; die scannen we opnieuw samen met de rest.
+        safe_end = len(buffer) - MAX_ID_LENGTH
+        for match in IMDB_ID_PATTERN.finditer(buffer):
+            if match.start() >= safe_end:
+                break
+            seen.setdefault(match.group().decode("ascii"), None)
+        carry = buffer[max(safe_end, 0):]
+    for match in IMDB_ID_PATTERN.finditer(carry):
+        seen.setdefault(match.group().decode("ascii"), None)
+    return list(seen)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+# ------------------------------
+# 📥 Bulk-imports als achtergrondjob, los van de Streamlit reruns
+# ------------------------------
+# Een job draait in een eigen thread en hoort bij een sleutel (de upload-hash). Een
+# rerun, een widget-klik of een weggevallen sessie onderbreekt hem niet: wie dezelfde
+# upload opnieuw opent, haakt in op de lopende job en ziet de live voortgang. Het
+# checkpointen (en hervatten na een herstart) doet de `work`-functie zelf.
+
+FINISHED_JOB_TTL_SECONDS = 24 * 60 * 60  # Afgeronde jobs een dag bewaren voor sessies die later inhaken
+
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+class ImportJob:
+    """Achtergrondjob met thread-safe voortgang; work(job) levert het resultaat"""
+
+    def __init__(self, job_id, total, work):
+        self.job_id = job_id
+        self.total = total
+        self.done = 0
+        self.status = RUNNING
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, args=(work,), daemon=True)
+        self.thread.start()
+
+    def advance(self, count=1):
+        with self.lock:
+            self.done = min(self.total, self.done + count)
+
+    def progress(self):
+        """(klaar, totaal) als momentopname"""
+        with self.lock:
+            return self.done, self.total
+
+    def _run(self, work):
+        try:
+            result = work(self)
+        except Exception as e:
+            print(f"Import {self.job_id} mislukt: {e}")
+            with self.lock:
+                self.status, self.error, self.finished_at = FAILED, str(e), time.time()
+            return
+        with self.lock:
+            self.result, self.status, self.finished_at = result, FINISHED, time.time()
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _prune_finished(now):
+    for job_id in [
+        job_id for job_id, job in _jobs.items()
+        if job.finished_at is not None and now - job.finished_at > FINISHED_JOB_TTL_SECONDS
+    ]:
+        del _jobs[job_id]
+
+
+def start_import_job(job_id, total, work):
+    """Geef de bestaande job voor deze sleutel terug, of start een nieuwe (ook na een mislukte)"""
+    with _jobs_lock:
+        _prune_finished(time.time())
+        job = _jobs.get(job_id)
+        if job is None or job.status == FAILED:
+            job = ImportJob(job_id, total, work)
+            _jobs[job_id] = job
+        return job
+
+
+def discard_import_job(job_id):
+    """Vergeet een afgeronde job, zodat de volgende load opnieuw begint (bv. na uitgesteld werk)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None and job.status != RUNNING:
+            del _jobs[job_id]
@@ -0,0 +1,144 @@
+import base64
+import json
+import struct
+import zlib
+
+# ------------------------------
+# 📦 Compacte cache-records voor OMDb-titels (Upstash + SQLite)
+# ------------------------------
+# Van de volledige OMDb JSON bewaren we alleen wat de kaart en de catalogus gebruiken.
+# Ratings gaan als getallen in een vaste binaire header (IMDb in tienden, RT in procent,
+# looptijd in minuten), de tekstvelden als NUL-gescheiden UTF-8. Het geheel wordt met
+# zlib gecomprimeerd en als base85 met een versie-prefix opgeslagen, omdat de Upstash
+# REST API alleen strings teruggeeft. Oude records (platte OMDb JSON) blijven leesbaar.
+#
+# Elk record draagt een schemaversie: "m<versie>:" voor titels en "n<versie>:" voor een
+# negatieve entry (OMDb kent het ID niet). Oude JSON zonder prefix telt als versie 0.
+# Vanaf versie 2 staat er ook een zachte vervaldatum in de header (stale-while-revalidate);
+# oudere records gelden als verouderd.
+
+RECORD_VERSION = 2
+RECORD_PREFIX = f"m{RECORD_VERSION}:"
+LEGACY_VERSION = 0
+SUPPORTED_VERSIONS = (LEGACY_VERSION, 1, RECORD_VERSION)
+NOT_FOUND_RECORD = f"n{RECORD_VERSION}:"
+NOT_FOUND_TTL_SECONDS = 3 * 24 * 60 * 60  # 3 dagen: kort, voor het geval OMDb de titel later toevoegt
+NOT_FOUND_ERRORS = ("incorrect imdb id", "not found")
+
+TEXT_FIELDS = ("Title", "Year", "Type", "Genre", "Director", "Actors", "Plot", "Poster")
+HEADERS = {
+    1: struct.Struct("<hbh"),  # imdbRating x10, Rotten Tomatoes %, looptijd in minuten
+    2: struct.Struct("<hbhI"),  # idem + zachte vervaldatum (unix tijd)
+}
+MISSING = -1
+BYTE_MAX = 2 ** 7 - 1
+SHORT_MAX = 2 ** 15 - 1
+POSTER_PREFIX = "https://m.media-amazon.com/images/M/"
+FIELD_SEPARATOR = "\x00"
+
+
+def parse_number(value, suffix=""):
+    try:
+        return int(value.removesuffix(suffix).strip())
+    except (AttributeError, ValueError):
+        return MISSING
+
+
+def fit(value, limit):
+    """MISSING als de waarde niet in het header-veld past (bv. een looptijd van 51420 min)"""
+    return value if MISSING <= value <= limit else MISSING
+
+
+def imdb_rating_tenths(value):
+    try:
+        return round(float(value) * 10)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def rotten_tomatoes_value(ratings):
+    for rate in ratings or []:
+        if rate.get("Source") == "Rotten Tomatoes":
+            return parse_number(rate.get("Value"), "%")
+    return MISSING
+
+
+def is_not_found_response(data):
+    """True als OMDb zegt dat het ID niet bestaat (niet bij quota- of key-fouten)"""
+    if not data or data.get("Response") != "False":
+        return False
+    error = str(data.get("Error", "")).lower()
+    return any(marker in error for marker in NOT_FOUND_ERRORS)
+
+
+def record_version(value):
+    """("m" of "n", versie) voor een record; oude JSON geeft ("m", LEGACY_VERSION)"""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    kind, separator, _ = value.partition(":")
+    if separator and kind[:1] in ("m", "n") and kind[1:].isdigit():
+        return kind[0], int(kind[1:])
+    return "m", LEGACY_VERSION
+
+
+def encode_movie(movie, fresh_until=0):
+    """OMDb-dict -> compacte, gecomprimeerde record-string; na `fresh_until` geldt het record als verouderd"""
+    header = HEADERS[RECORD_VERSION].pack(
+        fit(imdb_rating_tenths(movie.get("imdbRating")), SHORT_MAX),
+        fit(rotten_tomatoes_value(movie.get("Ratings")), BYTE_MAX),
+        fit(parse_number(movie.get("Runtime"), "min"), SHORT_MAX),
+        int(fresh_until),
+    )
+    texts = []
+    for field in TEXT_FIELDS:
+        value = str(movie.get(field) or "").replace(FIELD_SEPARATOR, " ")
+        if field == "Poster" and value.startswith(POSTER_PREFIX):
+            value = "~" + value[len(POSTER_PREFIX):]
+        texts.append(value)
+    payload = header + FIELD_SEPARATOR.join(texts).encode("utf-8")
+    return RECORD_PREFIX + base64.b85encode(zlib.compress(payload, 9)).decode("ascii")
+
+
+def decode_record(value):
+    """Record-string -> (OMDb-achtige dict, zachte vervaldatum).
+
+    Records zonder versie-prefix zijn de oude, volledige OMDb JSON en worden ongewijzigd
+    teruggegeven. Records zonder vervaldatum (oude JSON, versie 1) krijgen 0: verouderd.
+    """
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    kind, version = record_version(value)
+    if version == LEGACY_VERSION:
+        return json.loads(value), 0
+
+    header = HEADERS[version]
+    payload = zlib.decompress(base64.b85decode(value.partition(":")[2]))
+    imdb_tenths, rt_score, runtime, *rest = header.unpack_from(payload)
+    fresh_until = rest[0] if rest else 0
+    texts = payload[header.size:].decode("utf-8").split(FIELD_SEPARATOR)
+    movie = {field: text or "N/A" for field, text in zip(TEXT_FIELDS, texts)}
+    if movie["Poster"].startswith("~"):
+        movie["Poster"] = POSTER_PREFIX + movie["Poster"][1:]
+
+    ratings = []
+    if imdb_tenths != MISSING:
+        movie["imdbRating"] = f"{imdb_tenths / 10:.1f}"
+        ratings.append({"Source": "Internet Movie Database", "Value": f"{movie['imdbRating']}/10"})
+    else:
+        movie["imdbRating"] = "N/A"
+    if rt_score != MISSING:
+        ratings.append({"Source": "Rotten Tomatoes", "Value": f"{rt_score}%"})
+    movie["Ratings"] = ratings
+    movie["Runtime"] = f"{runtime} min" if runtime != MISSING else "N/A"
+    movie["Response"] = "True"
+    return movie, fresh_until
+
+
+def decode_movie(value):
+    """Record-string -> OMDb-achtige dict (zelfde keys als de kaart gebruikt)"""
+    return decode_record(value)[0]
+
+
+def is_legacy_record(value):
+    """True voor records in het oude formaat (volledige JSON), die herschreven mogen worden"""
+    return record_version(value) == ("m", LEGACY_VERSION)
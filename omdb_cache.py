@@ -0,0 +1,552 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from upstash_redis import Redis
+
+from enrichment import omdb_api_key, patch_dutch_plot, run_enrichment
+from http_client import limited_get
+from movie_records import (
+    LEGACY_VERSION, NOT_FOUND_RECORD, NOT_FOUND_TTL_SECONDS, SUPPORTED_VERSIONS,
+    decode_record, encode_movie, is_legacy_record, is_not_found_response, record_version,
+)
+from omdb_quota import PRIORITY_BACKGROUND, PRIORITY_VISIBLE, QuotaExceeded, omdb_get, use_redis_counter
+from refresh_queue import get_refresh_queue
+from sqlite_cache import get_local_cache, sqlite_cache_with_redis
+
+# ------------------------------
+# 🗂️ OMDb-cachelagen: geheugen -> Upstash Redis -> SQLite -> OMDb
+# ------------------------------
+# Alles wat zonder Streamlit moet werken: de OMDb-pagina gebruikt het voor de UI, de
+# CLI (warm_cache.py) om de caches vooraf te vullen. Er worden hier geen st-calls gedaan.
+
+# Gezet door connect_cache_backends(), na het laden van .env
+redis = None
+use_redis = False
+use_sqlite = True
+_backend_status = None
+_backend_lock = threading.Lock()
+
+
+def connect_cache_backends():
+    """Verbind één keer met Upstash (als de variabelen er zijn) en kies de SQLite-laag.
+
+    Geeft {"redis": bool, "sqlite": bool, "error": str of None} terug; een fout bij het
+    verbinden valt terug op alleen SQLite.
+    """
+    global redis, use_redis, use_sqlite, _backend_status
+    with _backend_lock:
+        if _backend_status is not None:
+            return _backend_status
+        error = None
+        redis_url = os.getenv("UPSTASH_REDIS_REST_URL")
+        redis_token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+        if redis_url and redis_token:
+            try:
+                redis = Redis(url=redis_url, token=redis_token)
+                use_redis = True
+                use_redis_counter(redis)  # Quotum delen met alle processen op deze database
+            except Exception as e:
+                error = str(e)
+                use_redis = False
+        # Lokale SQLite cache: fallback zonder Redis, of extra laag onder Redis
+        use_sqlite = not use_redis or sqlite_cache_with_redis()
+        _backend_status = {"redis": use_redis, "sqlite": use_sqlite, "error": error}
+        return _backend_status
+
+
+CACHE_TTL_SECONDS = 60 * 24 * 60 * 60  # 60 dagen: harde TTL, verouderde records blijven bruikbaar
+FRESH_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 dagen: daarna tonen en op de achtergrond verversen
+FRESH_TTL_JITTER = 0.25  # Vervaldatums spreiden over 22,5-30 dagen, zodat een import niet op één dag veroudert
+
+
+def fresh_until():
+    """Zachte vervaldatum (unix tijd) met jitter voor een vers opgehaald record"""
+    return time.time() + FRESH_TTL_SECONDS * random.uniform(1 - FRESH_TTL_JITTER, 1)
+
+
+# Een verouderd record blijft zo lang in het geheugen; daarna leest de volgende pick de
+# cache opnieuw en plant hij (opnieuw) een verversing, ook als de vorige op het quotum wachtte
+STALE_MEMORY_TTL_SECONDS = 15 * 60
+
+
+def memory_ttl(record_fresh_until):
+    """Geheugen-TTL voor een record: tot zijn zachte vervaldatum, nooit korter dan STALE_MEMORY_TTL_SECONDS"""
+    return max(record_fresh_until - time.time(), STALE_MEMORY_TTL_SECONDS)
+
+
+# ------------------------------
+# 🧠 In-process LRU cache (vóór Upstash, gedeeld door alle sessies)
+# ------------------------------
+def memory_cache_max_items():
+    return int(os.getenv("MEMORY_CACHE_MAX_ITEMS", "20000"))
+
+
+
+class MemoryLRUCache:
+    """Thread-safe LRU met vaste maximale grootte en TTL, met hit/miss tellers"""
+
+    def __init__(self, max_items, ttl_seconds):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """Geeft {key: value} terug voor alle keys die nog geldig in het geheugen staan"""
+        found = {}
+        now = time.time()
+        with self.lock:
+            for key in keys:
+                entry = self.items.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                expires_at, value = entry
+                if expires_at <= now:
+                    del self.items[key]
+                    self.misses += 1
+                    continue
+                self.items.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl_seconds=None):
+        with self.lock:
+            self.items[key] = (time.time() + (ttl_seconds or self.ttl_seconds), value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"items": len(self.items), "hits": self.hits, "misses": self.misses}
+
+
+# ------------------------------
+# ⚡ OMDb requests (dagquotum via omdb_quota.py, per host begrensd)
+# ------------------------------
+def get_movie_data_uncached(imdb_id, priority=PRIORITY_VISIBLE):
+    """Haal film op van OMDb (Engels voor volledige data + Nederlandse plot-patch).
+
+    Een antwoord met Response False komt ongewijzigd terug, zodat de aanroeper een
+    onbekend ID negatief kan cachen; {} betekent een netwerk- of andere fout.
+    Is het dagquotum voor deze prioriteit op, dan volgt QuotaExceeded.
+    """
+    try:
+        # Stap 1: Haal altijd de volledige Engelse dataset op (gegarandeerde ratings, director, cast)
+        url_en = f"http://www.omdbapi.com/?i={imdb_id}&apikey={omdb_api_key()}&plot=full"
+        response_en = omdb_get(url_en, priority, getter=limited_get, timeout=10)
+        response_en.raise_for_status()
+        data_en = response_en.json()
+        
+        if data_en.get('Response') != 'True':
+            return data_en
+            
+        # Stap 2: Probeer de Nederlandse vertaling van het plot op te halen en erin te patchen
+        try:
+            url_nl = f"http://www.omdbapi.com/?i={imdb_id}&apikey={omdb_api_key()}&plot=full&language=nl"
+            response_nl = omdb_get(url_nl, priority, getter=limited_get, timeout=10)
+            if response_nl.status_code == 200:
+                patch_dutch_plot(data_en, response_nl.json())
+        except Exception:
+            pass # Fallback naar Engelse beschrijving als NL niet beschikbaar is
+            
+        return data_en
+    except QuotaExceeded:
+        raise
+    except Exception as e:
+        print(f"OMDb Fetch Error voor {imdb_id}: {e}")
+        return {}
+
+
+def parse_cached_movie(cached_data):
+    """Zet een cache-record om naar (OMDb-data, verouderd, geheugen-TTL).
+
+    De data is {} voor een negatieve entry en None als het record opnieuw opgehaald moet worden.
+    """
+    kind, version = record_version(cached_data)
+    if version not in SUPPORTED_VERSIONS:
+        return None, False, None  # Onbekende schemaversie: opnieuw opbouwen in het huidige formaat
+    if kind == "n":
+        return {}, False, NOT_FOUND_TTL_SECONDS  # OMDb kent dit ID niet (korte TTL)
+    potential_data, record_fresh_until = decode_record(cached_data)
+    stale = record_fresh_until <= time.time()
+    if version != LEGACY_VERSION:
+        # Geschreven na een volledige fetch: ook zonder ratings geldig
+        return potential_data, stale, memory_ttl(record_fresh_until)
+    # AUTOMATISCHE HERSTELLER (alleen oude JSON-records): Als de gecachte data geen ratings bevat
+    # (oude language=nl bug), negeren we de cache zodat hij live compleet opnieuw wordt opgebouwd.
+    if isinstance(potential_data, dict) and len(potential_data.get("Ratings", [])) > 0:
+        return potential_data, stale, memory_ttl(record_fresh_until)
+    return None, False, None
+
+
+REDIS_MGET_CHUNK_SIZE = 200
+
+
+def read_cached_movies(imdb_ids, redis_errors):
+    """Lees ruwe cache-records in blokken via MGET (één HTTPS-request per blok bij Upstash)"""
+    cached_records = {}
+    for start in range(0, len(imdb_ids), REDIS_MGET_CHUNK_SIZE):
+        chunk = imdb_ids[start:start + REDIS_MGET_CHUNK_SIZE]
+        try:
+            values = redis.mget(*[f"movie:{imdb_id}" for imdb_id in chunk])
+        except Exception as e:
+            error_msg = f"Leesfout voor blok {chunk[0]}..{chunk[-1]}: {str(e)}"
+            if error_msg not in redis_errors:
+                redis_errors.append(error_msg)
+            continue
+        for imdb_id, value in zip(chunk, values or []):
+            if value:
+                cached_records[imdb_id] = value
+    return cached_records
+
+
+REDIS_WRITE_CHUNK_SIZE = 100
+
+
+class RedisWriteBuffer:
+    """Verzamelt cache-writes en schrijft ze in blokken via een Upstash pipeline in een achtergrondthread"""
+
+    def __init__(self, redis_errors, chunk_size=REDIS_WRITE_CHUNK_SIZE):
+        self.redis_errors = redis_errors
+        self.chunk_size = chunk_size
+        self.errors_lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def set(self, key, value, ex=CACHE_TTL_SECONDS):
+        self.pending.put((key, value, ex))
+
+    def close(self):
+        """Schrijf alles wat nog in de buffer zit weg en wacht tot de thread klaar is"""
+        self.pending.put(None)
+        self.thread.join()
+
+    def _run(self):
+        finished = False
+        while not finished:
+            item = self.pending.get()
+            if item is None:
+                break
+            batch = [item]
+            # Neem mee wat al klaarstaat, tot de blokgrootte bereikt is
+            while len(batch) < self.chunk_size:
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            pipeline = redis.pipeline()
+            for key, value, ex in batch:
+                pipeline.set(key, value, ex=ex)
+            pipeline.exec()
+        except Exception as e:
+            error_msg = f"Schrijffout voor {len(batch)} titels ({batch[0][0]}..{batch[-1][0]}): {str(e)}"
+            with self.errors_lock:
+                if error_msg not in self.redis_errors:
+                    self.redis_errors.append(error_msg)
+
+
+# ------------------------------
+# 🔄 Stale-while-revalidate (wachtrij in refresh_queue.py)
+# ------------------------------
+def write_movie_record(imdb_id, serialized_data, ttl):
+    """Schrijf één record naar Redis en/of SQLite; geeft exceptions door"""
+    key = f"movie:{imdb_id}"
+    if use_redis:
+        redis.set(key, serialized_data, ex=ttl)
+    if use_sqlite:
+        get_local_cache().set(key, serialized_data, ttl)
+
+
+def refresh_movie(imdb_id, memory_cache):
+    """Haal een verouderde titel opnieuw op; bij een fout (of zonder quotum) blijft het oude record staan"""
+    try:
+        movie_data = get_movie_data_uncached(imdb_id, PRIORITY_BACKGROUND)
+    except QuotaExceeded:
+        return False
+    if is_not_found_response(movie_data):
+        write_movie_record(imdb_id, NOT_FOUND_RECORD, NOT_FOUND_TTL_SECONDS)
+        memory_cache.set(imdb_id, {}, NOT_FOUND_TTL_SECONDS)
+        return True
+    if movie_data.get('Response') != 'True':
+        return False
+    until = fresh_until()
+    try:
+        write_movie_record(imdb_id, encode_movie(movie_data, until), CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"Verversen niet opgeslagen voor {imdb_id}: {e}")
+    memory_cache.set(imdb_id, movie_data, memory_ttl(until))
+    return True
+
+
+def schedule_refresh(imdb_ids, memory_cache):
+    """Zet verouderde titels in de achtergrondwachtrij; geeft het aantal nieuw ingeplande terug"""
+    refresh_queue = get_refresh_queue()
+    return sum(
+        refresh_queue.submit(imdb_id, lambda imdb_id=imdb_id: refresh_movie(imdb_id, memory_cache))
+        for imdb_id in imdb_ids
+    )
+
+
+# ------------------------------
+# 📥 Bulk-import in blokken met checkpoints (de achtergrondjob zelf staat in import_jobs.py)
+# ------------------------------
+IMPORT_CHUNK_SIZE = 200
+IMPORT_CHECKPOINT_TTL_SECONDS = 24 * 60 * 60  # 1 dag
+
+
+def new_import_report():
+    return {"new": 0, "deferred": 0, "failed": 0, "stale_ids": [], "errors": []}
+
+
+def load_movies_chunk(imdb_ids, memory_cache, report, advance, fetch_missing=True):
+    """Haal een blok films op uit cloud cache of OMDb met automatische herstelfunctie voor corrupte records.
+
+    Geen st-calls: dit draait in de thread van de import-job. Tellers en foutmeldingen gaan
+    naar `report`, de voortgang via advance(aantal). Met fetch_missing=False wordt alleen
+    de cache gelezen (blokken die een eerdere run al verwerkt heeft); wat daar ontbreekt
+    (verlopen, opgeruimd of nooit weggeschreven) telt als mislukt.
+    """
+    # Resultaten per positie bijhouden zodat de volgorde van de invoer behouden blijft
+    results = [None] * len(imdb_ids)
+    missing = []
+    legacy_records = {}
+    redis_errors = report["errors"]
+
+    # 1. Eerst het gedeelde geheugen, daarna Upstash Redis voor de rest (gebundelde MGET-calls)
+    memory_records = memory_cache.get_many(imdb_ids)
+    redis_ids = [imdb_id for imdb_id in imdb_ids if imdb_id not in memory_records]
+    cached_records = read_cached_movies(redis_ids, redis_errors) if use_redis and redis_ids else {}
+    if use_sqlite:
+        sqlite_ids = [imdb_id for imdb_id in redis_ids if imdb_id not in cached_records]
+        sqlite_records = {}
+        if sqlite_ids:
+            try:
+                sqlite_records = get_local_cache().get_many([f"movie:{imdb_id}" for imdb_id in sqlite_ids])
+            except Exception as e:
+                redis_errors.append(f"Leesfout lokale cache: {str(e)}")
+        for imdb_id in sqlite_ids:
+            if f"movie:{imdb_id}" in sqlite_records:
+                cached_records[imdb_id] = sqlite_records[f"movie:{imdb_id}"]
+    for i, imdb_id in enumerate(imdb_ids):
+        if imdb_id in memory_records:
+            # Ook {} (onbekend bij OMDb) telt als hit
+            results[i] = memory_records[imdb_id]
+            continue
+        movie_data, stale, ttl = None, False, None
+        cached_data = cached_records.get(imdb_id)
+        if cached_data:
+            try:
+                movie_data, stale, ttl = parse_cached_movie(cached_data)
+            except Exception as e:
+                error_msg = f"Leesfout voor {imdb_id}: {str(e)}"
+                if error_msg not in redis_errors:
+                    redis_errors.append(error_msg)
+
+        if movie_data is not None:
+            results[i] = movie_data
+            memory_cache.set(imdb_id, movie_data, ttl)
+            if movie_data and is_legacy_record(cached_data):
+                # Zonder vervaldatum: het compacte record blijft verouderd tot de verversing
+                try:
+                    legacy_records[f"movie:{imdb_id}"] = encode_movie(movie_data)
+                except Exception as e:
+                    print(f"Coderen mislukt voor {imdb_id}: {e}")
+            if stale:
+                report["stale_ids"].append(imdb_id)
+        else:
+            # Missers, corrupte records en records zonder Ratings gaan samen naar de fetch-stap
+            missing.append(i)
+
+    # 2. Niet (of incompleet) in de cache gevonden? Haal parallel live op bij OMDb via de async pipeline.
+    missing_ids = [imdb_ids[i] for i in missing] if fetch_missing else []
+    if not fetch_missing:
+        report["failed"] += len(missing)
+    advance(len(imdb_ids) - len(missing_ids))
+    write_buffer = RedisWriteBuffer(redis_errors) if use_redis and (missing_ids or legacy_records) else None
+    sqlite_writes = {}
+    sqlite_not_found = {}
+
+    # Migratie: oude JSON-records meteen in het compacte formaat terugschrijven
+    for key, serialized_data in legacy_records.items():
+        if write_buffer:
+            write_buffer.set(key, serialized_data)
+        if use_sqlite:
+            sqlite_writes[key] = serialized_data
+
+    def store_result(j, imdb_id, movie_data):
+        if movie_data is None:
+            report["deferred"] += 1  # Wacht op het OMDb-dagquotum: niets cachen
+        elif movie_data and movie_data.get('Response') == 'True':
+            results[missing[j]] = movie_data
+            until = fresh_until()
+            memory_cache.set(imdb_id, movie_data, memory_ttl(until))
+            report["new"] += 1
+            
+            # Sla de gecorrigeerde data compact op in Upstash (gebufferd, blokkeert het ophalen niet)
+            try:
+                serialized_data = encode_movie(movie_data, until)
+            except Exception as e:
+                redis_errors.append(f"Coderen mislukt voor {imdb_id}: {str(e)}")  # Wel tonen, niet cachen
+                advance(1)
+                return
+            if write_buffer:
+                write_buffer.set(f"movie:{imdb_id}", serialized_data)
+            if use_sqlite:
+                sqlite_writes[f"movie:{imdb_id}"] = serialized_data
+        elif is_not_found_response(movie_data):
+            # Negatieve cache: bij de volgende upload geen OMDb-calls meer voor dit ID
+            memory_cache.set(imdb_id, {}, NOT_FOUND_TTL_SECONDS)
+            if write_buffer:
+                write_buffer.set(f"movie:{imdb_id}", NOT_FOUND_RECORD, ex=NOT_FOUND_TTL_SECONDS)
+            if use_sqlite:
+                sqlite_not_found[f"movie:{imdb_id}"] = NOT_FOUND_RECORD
+        else:
+            report["failed"] += 1  # Netwerkfout of ander OMDb-antwoord: bij een volgende run opnieuw
+        advance(1)
+
+    try:
+        if missing_ids:
+            run_enrichment(missing_ids, "omdb", on_result=store_result)
+    finally:
+        if write_buffer:
+            write_buffer.close()
+        if sqlite_writes or sqlite_not_found:
+            try:
+                get_local_cache().set_many(sqlite_writes, CACHE_TTL_SECONDS)
+                get_local_cache().set_many(sqlite_not_found, NOT_FOUND_TTL_SECONDS)
+            except Exception as e:
+                redis_errors.append(f"Schrijffout lokale cache: {str(e)}")
+
+    return results
+
+
+def save_import_checkpoint(upload_digest, checkpoint):
+    key = f"import:{upload_digest}"
+    value = json.dumps(checkpoint)
+    try:
+        if use_redis:
+            redis.set(key, value, ex=IMPORT_CHECKPOINT_TTL_SECONDS)
+        if use_sqlite:
+            get_local_cache().set(key, value, IMPORT_CHECKPOINT_TTL_SECONDS)
+    except Exception as e:
+        print(f"Schrijffout import-checkpoint {upload_digest[:12]}: {e}")
+
+
+def load_import_checkpoint(upload_digest):
+    key = f"import:{upload_digest}"
+    try:
+        value = redis.get(key) if use_redis else None
+        if not value and use_sqlite:
+            value = get_local_cache().get(key)
+        return json.loads(value) if value else None
+    except Exception as e:
+        print(f"Leesfout import-checkpoint {upload_digest[:12]}: {e}")
+        return None
+
+
+def clear_import_checkpoint(upload_digest):
+    key = f"import:{upload_digest}"
+    try:
+        if use_redis:
+            redis.delete(key)
+        if use_sqlite:
+            get_local_cache().delete(key)
+    except Exception as e:
+        print(f"Verwijderfout import-checkpoint {upload_digest[:12]}: {e}")
+
+
+def run_import(imdb_ids, upload_digest, memory_cache, advance):
+    """Bulk-import: per blok laden en daarna een checkpoint in de cache zetten; geeft (films, rapport).
+
+    Na een herstart worden de blokken vóór het checkpoint alleen uit de cache gelezen.
+    Het checkpoint schuift niet voorbij een blok met titels die op het quotum wachten, die
+    niet opgehaald konden worden of met een cachefout (ook bij het wegschrijven); mist een
+    blok vóór het checkpoint titels in de cache, dan gaat het checkpoint daarheen terug.
+    Zo probeert een volgende import ze opnieuw.
+    Verouderde titels staan in report["stale_ids"]; verversen is aan de aanroeper.
+    """
+    checkpoint = load_import_checkpoint(upload_digest) or {}
+    resume_from = checkpoint.get("next", 0) if checkpoint.get("total") == len(imdb_ids) else 0
+    report = new_import_report()
+    movies = []
+    next_index = 0
+    for start in range(0, len(imdb_ids), IMPORT_CHUNK_SIZE):
+        chunk = imdb_ids[start:start + IMPORT_CHUNK_SIZE]
+        pending_before = report["deferred"] + report["failed"] + len(report["errors"])
+        results = load_movies_chunk(chunk, memory_cache, report, advance, fetch_missing=start >= resume_from)
+        movies.extend((imdb_id, movie_data) for imdb_id, movie_data in zip(chunk, results) if movie_data)
+        pending = report["deferred"] + report["failed"] + len(report["errors"])
+        if pending == pending_before and next_index == start:
+            next_index = start + len(chunk)
+            if next_index > resume_from:
+                save_import_checkpoint(upload_digest, {"total": len(imdb_ids), "next": next_index})
+
+    if next_index >= len(imdb_ids):
+        clear_import_checkpoint(upload_digest)  # Volledig klaar: een volgende import begint vooraan
+    elif next_index < resume_from:
+        save_import_checkpoint(upload_digest, {"total": len(imdb_ids), "next": next_index})
+    return movies, report
+
+
+# ------------------------------
+# 🎯 Eén titel (lazy modus en prefetch)
+# ------------------------------
+def load_movie(imdb_id, memory_cache):
+    """Eén titel via geheugen -> Redis -> SQLite -> OMDb; veilig vanuit achtergrondthreads (geen st-calls)"""
+    memory_records = memory_cache.get_many([imdb_id])
+    if imdb_id in memory_records:
+        return memory_records[imdb_id]
+
+    key = f"movie:{imdb_id}"
+    try:
+        cached_data = redis.get(key) if use_redis else None
+        if not cached_data and use_sqlite:
+            cached_data = get_local_cache().get(key)
+        movie_data, stale, ttl = parse_cached_movie(cached_data) if cached_data else (None, False, None)
+    except Exception as e:
+        print(f"Cache leesfout voor {imdb_id}: {e}")
+        movie_data, stale, ttl = None, False, None
+
+    if movie_data is None:
+        try:
+            movie_data = get_movie_data_uncached(imdb_id)
+        except QuotaExceeded:
+            return {}  # Uitgesteld: de UI meldt het quotum
+        if is_not_found_response(movie_data):
+            serialized_data, record_ttl, movie_data = NOT_FOUND_RECORD, NOT_FOUND_TTL_SECONDS, {}
+            ttl = NOT_FOUND_TTL_SECONDS
+        elif movie_data.get('Response') == 'True':
+            until = fresh_until()
+            serialized_data, record_ttl, ttl = None, CACHE_TTL_SECONDS, memory_ttl(until)
+        else:
+            return {}  # Netwerk-, quota- of key-fout: niet cachen
+        try:
+            if serialized_data is None:
+                serialized_data = encode_movie(movie_data, until)
+            write_movie_record(imdb_id, serialized_data, record_ttl)
+        except Exception as e:
+            print(f"Cache schrijffout voor {imdb_id}: {e}")
+    elif stale:
+        schedule_refresh([imdb_id], memory_cache)
+
+    memory_cache.set(imdb_id, movie_data, ttl)
+    return movie_data
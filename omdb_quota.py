@@ -0,0 +1,253 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+from http_client import http_get
+from sqlite_cache import get_local_cache
+
+# ------------------------------
+# 🎟️ OMDb-dagquotum: token bucket + boekhouding per API key
+# ------------------------------
+# Elke OMDb-call gaat eerst langs de scheduler van zijn key. Die boekt de calls per
+# (UTC-)dag in een gedeelde teller (Upstash Redis INCRBY als Redis verbonden is, anders
+# een SQLite-transactie), zodat een herstart, de cron-warmer en meerdere app-processen
+# samen binnen het quotum van de key blijven. Om niet elke call een round trip te kosten
+# leent een proces QUOTA_LEASE_SIZE calls tegelijk en verbruikt die lokaal; wat aan het
+# eind van de dag (of bij een herstart) nog geleend is, telt als verbruikt. Daarnaast
+# doseert hij de calls met een token bucket. Achtergrondwerk mag maar een deel van het
+# quotum gebruiken: wat over is blijft voor de titels die iemand op het scherm heeft.
+# Als het quotum voor een prioriteit op is, volgt QuotaExceeded in plaats van een
+# stille {}; de aanroeper stelt het werk dan uit.
+
+PRIORITY_VISIBLE = 0  # Getoonde of gekozen titel (en de prefetch van de volgende picks)
+PRIORITY_BULK = 1  # Verrijking van een hele upload
+PRIORITY_BACKGROUND = 2  # Verversen van verouderde records
+
+QUOTA_SHARES = {
+    PRIORITY_VISIBLE: 1.0,
+    PRIORITY_BULK: 0.9,  # 10% blijft gereserveerd voor wat er getoond wordt
+    PRIORITY_BACKGROUND: 0.7,
+}
+QUOTA_RECORD_TTL_SECONDS = 2 * 24 * 60 * 60
+QUOTA_LEASE_SIZE = 10  # Calls per boeking in de gedeelde teller
+QUOTA_STATS_TTL_SECONDS = 5  # stats() leest de gedeelde teller hooguit zo vaak
+
+# Gezet door omdb_cache.connect_cache_backends(); zonder Redis telt de lokale SQLite cache
+_redis = None
+
+
+def use_redis_counter(redis):
+    """Tel het verbruik voortaan in Upstash Redis, gedeeld met elk proces op dezelfde database"""
+    global _redis
+    _redis = redis
+
+
+def omdb_daily_quota():
+    return int(os.getenv("OMDB_DAILY_QUOTA", "1000"))
+
+
+def omdb_requests_per_second():
+    return float(os.getenv("OMDB_REQUESTS_PER_SECOND", "10"))
+
+
+def omdb_burst():
+    return int(os.getenv("OMDB_BURST", "10"))
+
+
+class QuotaExceeded(Exception):
+    """Het OMDb-dagquotum voor deze prioriteit is op; het werk wordt uitgesteld"""
+
+
+class OmdbScheduler:
+    """Thread-safe token bucket met dagquotum; hogere prioriteit gaat voor bij het wachten op tokens.
+
+    De gedeelde teller wordt alleen onder `lease_lock` aangesproken, nooit onder
+    `condition`: wachten op Upstash houdt het uitdelen van tokens niet op.
+    """
+
+    def __init__(self, key_id, daily_quota=None, rate=None, burst=None):
+        self.key_id = key_id
+        self.daily_quota = omdb_daily_quota() if daily_quota is None else daily_quota
+        self.rate = max(omdb_requests_per_second() if rate is None else rate, 0.01)
+        self.burst = max(omdb_burst() if burst is None else burst, 1)
+        self.condition = threading.Condition()
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waiting = {priority: 0 for priority in QUOTA_SHARES}
+        self.lease_lock = threading.Lock()
+        self.day = None
+        self.used = 0
+        self.deferred = 0
+        self.leased = 0
+        self.lease_end = 0
+        self.stats_read_at = None
+
+    def _cache_key(self):
+        return f"omdb_quota:{self.key_id}:{self.day}"
+
+    def _load_day(self):
+        today = datetime.now(timezone.utc).date().isoformat()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+            self.deferred = 0
+            self.leased = 0
+            self.lease_end = 0
+            self.stats_read_at = None
+
+    def _reserve(self, amount, limit):
+        """Boek tot `amount` calls in de gedeelde teller zonder `limit` te passeren; geeft (toegekend, teller)"""
+        key = self._cache_key()
+        if _redis is not None:
+            try:
+                used = int(_redis.incrby(key, amount))
+                if used == amount:
+                    _redis.expire(key, QUOTA_RECORD_TTL_SECONDS)
+                excess = min(amount, max(0, used - limit))
+                if excess:
+                    _redis.decrby(key, excess)  # Niet toegekend: dat deel van de boeking terugdraaien
+                return amount - excess, used - excess
+            except Exception as e:
+                print(f"Quotumteller Redis mislukt, lokale teller gebruikt: {e}")
+        try:
+            return get_local_cache().increment(key, QUOTA_RECORD_TTL_SECONDS, amount, limit)
+        except Exception as e:
+            print(f"Quotumteller SQLite mislukt, alleen in geheugen geteld: {e}")
+            granted = max(0, min(amount, limit - self.used))
+            return granted, self.used + granted
+
+    def _read_used(self):
+        key = self._cache_key()
+        try:
+            value = _redis.get(key) if _redis is not None else get_local_cache().get(key)
+            return int(value or 0)
+        except Exception as e:
+            print(f"Leesfout OMDb-quotum: {e}")
+            return self.used
+
+    def _take_leased(self, limit):
+        """Gebruik één geleende call, als zijn plek in de teller binnen `limit` valt"""
+        if self.leased and self.lease_end - self.leased + 1 <= limit:
+            self.leased -= 1
+            return True
+        return False
+
+    def _take_quota(self, priority):
+        limit = self.limit(priority)
+        with self.lease_lock:
+            self._load_day()
+            if self._take_leased(limit):
+                return
+            if not self.leased and self.used < limit:
+                granted, used = self._reserve(QUOTA_LEASE_SIZE, limit)
+                self.used = max(self.used, used)
+                if granted:
+                    self.leased, self.lease_end = granted, used
+                    if self._take_leased(limit):
+                        return
+            self.deferred += 1
+            self.used = max(self.used, limit)
+            raise QuotaExceeded(f"OMDb-dagquotum bereikt ({self.used}/{self.daily_quota} calls vandaag)")
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def limit(self, priority):
+        return int(self.daily_quota * QUOTA_SHARES[priority])
+
+    def acquire(self, priority=PRIORITY_VISIBLE):
+        """Reserveer één call op het quotum en wacht op een token; QuotaExceeded als het quotum op is"""
+        self._take_quota(priority)
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    ahead = any(count for other, count in self.waiting.items() if other < priority)
+                    if self.tokens >= 1 and not ahead:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.05
+                    self.condition.wait(timeout=max(wait, 0.01))
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    def mark_exhausted(self):
+        """OMDb meldt zelf dat de limiet bereikt is: de rest van de dag niets meer versturen"""
+        with self.lease_lock:
+            self._load_day()
+            self.used = max(self.used, self.daily_quota)
+            self.leased = 0
+            key, used = self._cache_key(), self.used
+        try:
+            if _redis is not None:
+                _redis.set(key, str(used), ex=QUOTA_RECORD_TTL_SECONDS)
+            else:
+                get_local_cache().set(key, str(used), QUOTA_RECORD_TTL_SECONDS)
+        except Exception as e:
+            print(f"Schrijffout OMDb-quotum: {e}")
+
+    def stats(self):
+        """Verbruik vandaag; de gedeelde teller wordt hooguit elke QUOTA_STATS_TTL_SECONDS gelezen"""
+        with self.lease_lock:
+            self._load_day()
+            now = time.monotonic()
+            refresh = self.stats_read_at is None or now - self.stats_read_at >= QUOTA_STATS_TTL_SECONDS
+            if refresh:
+                self.stats_read_at = now  # Andere threads gebruiken intussen de vorige stand
+        if refresh:
+            used = self._read_used()  # Ook wat andere processen vandaag verbruikten
+            with self.lease_lock:
+                self.used = max(self.used, used)
+        with self.lease_lock:
+            return {
+                "used": self.used,
+                "quota": self.daily_quota,
+                # Geleende calls staan al in de teller, maar zijn nog te gebruiken
+                "remaining": max(0, self.daily_quota - self.used) + self.leased,
+                "deferred": self.deferred,
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_omdb_scheduler(api_key):
+    """Proces-brede scheduler per API key (de key zelf wordt niet opgeslagen, alleen een hash)"""
+    key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key_id)
+        if scheduler is None:
+            scheduler = OmdbScheduler(key_id)
+            _schedulers[key_id] = scheduler
+        return scheduler
+
+
+def quota_message(api_key, deferred_count=None):
+    """Uitleg voor de gebruiker als er werk wacht op het OMDb-dagquotum"""
+    stats = get_omdb_scheduler(api_key).stats()
+    waiting = f"{deferred_count} titels wachten" if deferred_count else "Nieuwe titels wachten"
+    return (
+        f"⏸️ OMDb-dagquotum bereikt ({stats['used']}/{stats['quota']} calls vandaag). "
+        f"{waiting} tot morgen; wat al in de cache staat blijft gewoon beschikbaar."
+    )
+
+
+def omdb_get(url, priority=PRIORITY_VISIBLE, getter=http_get, **kwargs):
+    """GET naar OMDb via de scheduler van de API key in de URL of params"""
+    api_key = (kwargs.get("params") or {}).get("apikey")
+    if api_key is None:
+        api_key = parse_qs(urlparse(url).query).get("apikey", [""])[0]
+    scheduler = get_omdb_scheduler(api_key)
+    scheduler.acquire(priority)
+    response = getter(url, **kwargs)
+    if response.status_code == 401 and "limit" in response.text.lower():
+        scheduler.mark_exhausted()
+    return response
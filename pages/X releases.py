@@ -1,7 +1,8 @@
 import os
 import streamlit as st
-import requests
 from datetime import datetime, date
+from http_client import http_get
+from tmdb_discover import discover_movies, fetch_movie_genres, fill_english_overviews, genre_ids
 
 # Streamlit config
 st.set_page_config(page_title="🎥 Future Film Radar Pro", layout="wide")
@@ -14,24 +15,26 @@ if not TMDB_API_KEY:
     st.error("❌ TMDB_API_KEY ontbreekt in de environment variables!")
     st.stop()
 
+CARDS_PER_PAGE = 20  # Details worden pas opgehaald als een kaart getoond wordt
+MAX_SKIPPED_LINES = 50
+
 # --------- API FUNCTIES ---------
 @st.cache_data(ttl=3600)
-def fetch_movies_for_year(year, max_pages=5, min_release_date=None, genre=None):
-    all_movies = []
+def fetch_movies_for_year(year, max_pages=None, min_release_date=None, genre=None, with_genres=()):
+    """Alle films van het jaar (of de eerste max_pages pagina's), parallel opgehaald via tmdb_discover.
+
+    with_genres: TMDb genre-ID's; een film moet er minstens één van hebben (server-side filter).
+    """
     if min_release_date is None:
         min_release_date = f"{year}-01-01"
     end_date = f"{year}-12-31"
 
-    base_url = "https://api.themoviedb.org/3/discover/movie"
     search_url = "https://api.themoviedb.org/3/search/movie"
 
     params_base = {
         "api_key": TMDB_API_KEY,
         "language": "nl-NL",
         "sort_by": "popularity.desc",
-        "primary_release_date.gte": min_release_date,
-        "primary_release_date.lte": end_date,
-        "page": 1,
     }
 
     if genre == "Erotisch":
@@ -39,23 +42,15 @@ def fetch_movies_for_year(year, max_pages=5, min_release_date=None, genre=None):
     else:
         params_base["include_adult"] = False
 
+    if with_genres:
+        params_base["with_genres"] = "|".join(str(genre_id) for genre_id in with_genres)  # | = OF
+
     # Eerst discover movies ophalen
-    for page in range(1, max_pages + 1):
-        params = params_base.copy()
-        params["page"] = page
-        try:
-            resp = requests.get(base_url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            results = data.get("results", [])
-            if not results:
-                break
-            all_movies.extend(results)
-            if page >= data.get("total_pages", 0):
-                break
-        except Exception as e:
-            st.error(f"Fout bij ophalen films (pagina {page}): {e}")
-            break
+    start = datetime.strptime(min_release_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    all_movies, errors = discover_movies(params_base, start, end, max_pages)
+    for error in errors[:3]:
+        st.error(error)
 
     # Voor Erotisch genre extra zoeken op keywords in titel/beschrijving
     if genre == "Erotisch":
@@ -74,7 +69,7 @@ def fetch_movies_for_year(year, max_pages=5, min_release_date=None, genre=None):
                     "primary_release_date.lte": end_date,
                 }
                 try:
-                    resp = requests.get(search_url, params=search_params, timeout=10)
+                    resp = http_get(search_url, params=search_params)
                     resp.raise_for_status()
                     data = resp.json()
                     results = data.get("results", [])
@@ -90,8 +85,27 @@ def fetch_movies_for_year(year, max_pages=5, min_release_date=None, genre=None):
                     st.error(f"Fout bij TMDB zoekactie '{keyword}' pagina {page}: {e}")
                     break
 
+    if genre == "Erotisch":
+        # Engelse beschrijving als fallback voor de keyword-filter (geen detail-call per titel)
+        for error in fill_english_overviews(all_movies, params_base, start, end, max_pages)[:3]:
+            st.error(error)
+
     return all_movies
 
+@st.cache_data(ttl=24 * 3600)
+def get_movie_genres():
+    """TMDb genrelijst (/genre/movie/list): naam -> ID, één keer per dag opgehaald"""
+    return fetch_movie_genres(TMDB_API_KEY)
+
+def get_genre_ids(names):
+    if not names:
+        return []
+    try:
+        return genre_ids(get_movie_genres(), names)
+    except Exception as e:
+        st.warning(f"Genrelijst ophalen mislukt, er wordt niet op genre gefilterd: {e}")
+        return []
+
 @st.cache_data(ttl=3600)
 def get_movie_details_cached(movie_id):
     url = f"https://api.themoviedb.org/3/movie/{movie_id}"
@@ -101,12 +115,12 @@ def get_movie_details_cached(movie_id):
         "append_to_response": "credits",
     }
     try:
-        resp = requests.get(url, params=params, timeout=10)
+        resp = http_get(url, params=params)
         resp.raise_for_status()
         data = resp.json()
         if not data.get("overview"):
             params["language"] = "en-US"
-            resp_en = requests.get(url, params=params, timeout=5)
+            resp_en = http_get(url, params=params, timeout=5)
             if resp_en.ok:
                 data_en = resp_en.json()
                 data["overview"] = data_en.get("overview", "Geen beschrijving beschikbaar")
@@ -152,7 +166,7 @@ def display_movie(movie, details):
         with col2:
             title_col, logo_col = st.columns([4, 1])
             with title_col:
-                st.subheader(details.get("title", "Onbekende titel"))
+                st.subheader(details.get("title") or movie.get("title", "Onbekende titel"))
             with logo_col:
                 imdb_id = details.get("imdb_id", "")
                 tmdb_id = str(movie.get("id", ""))
@@ -170,7 +184,7 @@ def display_movie(movie, details):
             st.markdown(f"**📅 Release datum:** {format_date(movie.get('release_date',''))}")
             runtime = details.get("runtime")
             st.markdown(f"**⏱️ Looptijd:** {runtime} minuten" if runtime else "**⏱️ Looptijd:** Onbekend")
-            st.markdown(f"**⭐ Score:** {details.get('vote_average', 'N/A')}")
+            st.markdown(f"**⭐ Score:** {details.get('vote_average', movie.get('vote_average', 'N/A'))}")
             cast = get_cast(details)
             if cast:
                 st.markdown("**🌟 Hoofdrollen:**")
@@ -181,7 +195,7 @@ def display_movie(movie, details):
                             st.image(actor_img, width=80, caption=actor_name)
                         else:
                             st.markdown(f"- {actor_name}")
-            st.markdown(f"**📖 Verhaal:**  \n{details.get('overview', 'Geen beschrijving beschikbaar')}")
+            st.markdown(f"**📖 Verhaal:**  \n{details.get('overview') or movie.get('overview') or 'Geen beschrijving beschikbaar'}")
 
 # --------- MAIN ---------
 def main():
@@ -202,21 +216,26 @@ def main():
     else:
         min_release_date = None
 
+    genre_map = {
+        "Blockbuster": ["Actie", "Avontuur", "Science Fiction", "Sciencefiction", "Fantasy", "Action", "Adventure", "Sci-Fi"],
+        "Arthouse": ["Drama", "Art House", "Independent"],
+        "Erotisch": ["Romance", "Romantiek", "Erotic", "Drama", "Thriller"],
+        "Horror": ["Horror", "Thriller", "Mystery", "Mysterie"]
+    }
+    # Genre server-side filteren: namen -> TMDb genre-ID's (onbekende namen zoals "Art House" vallen weg)
+    allowed_genre_ids = get_genre_ids(genre_map.get(selected_genre, []))
+
     with st.spinner("Films laden..."):
-        movies = fetch_movies_for_year(int(selected_year), min_release_date=min_release_date, genre=selected_genre)
+        movies = fetch_movies_for_year(
+            int(selected_year), min_release_date=min_release_date, genre=selected_genre,
+            with_genres=tuple(allowed_genre_ids),
+        )
 
     st.info(f"📥 TMDB gaf {len(movies)} films terug voor {selected_year}")
 
     today = datetime.now().date()
     filtered_movies = []
 
-    genre_map = {
-        "Blockbuster": ["Actie", "Avontuur", "Science Fiction", "Fantasy", "Action", "Adventure", "Sci-Fi", "Fantasy"],
-        "Arthouse": ["Drama", "Art House", "Independent"],
-        "Erotisch": ["Romance", "Erotic", "Drama", "Thriller"],
-        "Horror": ["Horror", "Thriller", "Mystery"]
-    }
-
     # Sleutelwoorden voor erotisch genre in overzicht (NEDERLANDS en Engels, klein)
     erotic_keywords = [
         "naakt", "seks", "intimiteit", "lust", "passie", "verleiding",
@@ -227,74 +246,67 @@ def main():
 
     skipped_no_release = 0
     skipped_released = 0
-    skipped_no_details = 0
     skipped_genre = 0
     skipped_erotic = 0
+    skipped = []  # Redenen per titel, beperkt getoond
 
     for movie in movies:
         release_date_str = movie.get("release_date")
         if not release_date_str:
             skipped_no_release += 1
-            st.write(f"⏭️ {movie.get('title')} — geen release date")
+            skipped.append(f"⏭️ {movie.get('title')} — geen release date")
             continue
 
         try:
             release_date = datetime.strptime(release_date_str, "%Y-%m-%d").date()
         except Exception:
             skipped_no_release += 1
-            st.write(f"⏭️ {movie.get('title')} — ongeldige release date")
+            skipped.append(f"⏭️ {movie.get('title')} — ongeldige release date")
             continue
 
         if not show_released and release_date < today:
             skipped_released += 1
-            st.write(f"⏭️ {movie.get('title')} — al uitgebracht ({release_date})")
+            skipped.append(f"⏭️ {movie.get('title')} — al uitgebracht ({release_date})")
             continue
 
-        details = get_movie_details_cached(movie["id"])
-        if not details:
-            skipped_no_details += 1
-            st.write(f"⏭️ {movie.get('title')} — geen details")
+        # Genre via de genre_ids uit de lijst (zelfde filter als with_genres); geen details nodig
+        if allowed_genre_ids and not set(movie.get("genre_ids", [])) & set(allowed_genre_ids):
+            skipped_genre += 1
+            skipped.append(f"⏭️ {movie.get('title')} — genre {movie.get('genre_ids')} matcht niet met {genre_map[selected_genre]}")
             continue
 
         if selected_genre == "Erotisch":
-            genre_names = [g["name"] for g in details.get("genres", [])]
-            allowed_genres = genre_map.get("Erotisch", [])
-            if not any(g in allowed_genres for g in genre_names):
-                skipped_genre += 1
-                st.write(f"⏭️ {movie.get('title')} — genre {genre_names} matcht niet met {allowed_genres}")
-                continue
-            overview = details.get("overview", "").lower()
-            if not any(kw in overview for kw in erotic_keywords):
+            overview = movie.get("overview") or ""
+            if not any(kw in overview.lower() for kw in erotic_keywords):
                 skipped_erotic += 1
-                st.write(f"⏭️ {movie.get('title')} — overview matcht niet op erotische keywords")
+                skipped.append(f"⏭️ {movie.get('title')} — overview matcht niet op erotische keywords")
                 continue
-        else:
-            if selected_genre != "Alles":
-                genre_names = [g["name"] for g in details.get("genres", [])]
-                allowed_genres = genre_map.get(selected_genre, [])
-                if not any(g in allowed_genres for g in genre_names):
-                    skipped_genre += 1
-                    st.write(f"⏭️ {movie.get('title')} — genre {genre_names} matcht niet met {allowed_genres}")
-                    continue
 
-        filtered_movies.append((movie, details))
+        filtered_movies.append(movie)
 
-    filtered_movies.sort(key=lambda x: x[0].get("release_date") or "")
+    filtered_movies.sort(key=lambda movie: movie.get("release_date") or "")
 
     st.info(f"✅ Overgebleven films: {len(filtered_movies)}")
     st.write(f"❌ Geen release date: {skipped_no_release}")
     st.write(f"❌ Al uitgebracht: {skipped_released}")
-    st.write(f"❌ Geen details: {skipped_no_details}")
     st.write(f"❌ Genre mismatch: {skipped_genre}")
     if skipped_erotic:
         st.write(f"❌ Erotische filter mismatch (geen keywords): {skipped_erotic}")
+    if skipped:
+        with st.expander(f"⏭️ Overgeslagen titels ({len(skipped)})"):
+            for line in skipped[:MAX_SKIPPED_LINES]:
+                st.write(line)
+            if len(skipped) > MAX_SKIPPED_LINES:
+                st.write(f"… en nog {len(skipped) - MAX_SKIPPED_LINES} titels")
 
     if not filtered_movies:
         st.warning("Geen films gevonden met deze filters.")
     else:
         st.success(f"Gevonden: {len(filtered_movies)} films voor {selected_year}")
-        for movie, details in filtered_movies:
-            display_movie(movie, details)
+        page_count = (len(filtered_movies) + CARDS_PER_PAGE - 1) // CARDS_PER_PAGE
+        page = st.number_input(f"Pagina (van {page_count})", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+        for movie in filtered_movies[(page - 1) * CARDS_PER_PAGE:page * CARDS_PER_PAGE]:
+            display_movie(movie, get_movie_details_cached(movie["id"]) or {})
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,23 @@
 import os
 import streamlit as st
-import pandas as pd
 import requests
 import random
-import re
-import json
 import hashlib
-from datetime import datetime, timedelta
-from io import StringIO
-from upstash_redis import Redis
+import time
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from imdb_ids import extract_imdb_ids
+from catalogue import MovieCatalogue
+from import_jobs import FAILED, RUNNING, discard_import_job, start_import_job
+from omdb_quota import get_omdb_scheduler, quota_message
+from omdb_cache import (
+    FRESH_TTL_SECONDS, MemoryLRUCache, connect_cache_backends, memory_cache_max_items,
+    load_movie, run_import, schedule_refresh,
+)
+from parental_guide import load_sex_nudity_rating
+from trailers import find_youtube_trailer
+from http_client import http_get
 
 try:
     from dotenv import load_dotenv
@@ -26,127 +35,219 @@ if not OMDB_API_KEY:
 # ------------------------------
 # 🗂️ PERMANENTE CLOUD CACHE (Upstash Redis)
 # ------------------------------
-REDIS_URL = os.getenv("UPSTASH_REDIS_REST_URL")
-REDIS_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+cache_status = connect_cache_backends()
+if cache_status["error"]:
+    st.error(f"❌ Fout bij initialiseren Upstash verbinding: {cache_status['error']}")
+elif not cache_status["redis"]:
+    st.warning("⚠️ Upstash Redis variabelen niet gevonden. App gebruikt de lokale SQLite cache.")
 
-if REDIS_URL and REDIS_TOKEN:
-    try:
-        redis = Redis(url=REDIS_URL, token=REDIS_TOKEN)
-        use_redis = True
-    except Exception as e:
-        st.error(f"❌ Fout bij initialiseren Upstash verbinding: {str(e)}")
-        use_redis = False
-else:
-    st.warning("⚠️ Upstash Redis variabelen niet gevonden. App draait zonder permanente cache.")
-    use_redis = False
+# Actieve lagen (SQLite: fallback zonder Redis, of extra laag onder Redis)
+use_redis = cache_status["redis"]
+use_sqlite = cache_status["sqlite"]
 
-CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 dagen
+@st.cache_resource
+def get_memory_cache():
+    return MemoryLRUCache(memory_cache_max_items(), FRESH_TTL_SECONDS)
 
-def get_movie_data_uncached(imdb_id):
-    """Haal film op van OMDb (Engels voor volledige data + Nederlandse plot-patch)"""
-    try:
-        # Stap 1: Haal altijd de volledige Engelse dataset op (gegarandeerde ratings, director, cast)
-        url_en = f"http://www.omdbapi.com/?i={imdb_id}&apikey={OMDB_API_KEY}&plot=full"
-        response_en = requests.get(url_en, timeout=10)
-        response_en.raise_for_status()
-        data_en = response_en.json()
+# ------------------------------
+# 📥 Bulk-import: hervatbare achtergrondjob per upload (job zelf in import_jobs.py)
+# ------------------------------
+IMPORT_POLL_SECONDS = 1
+
+def run_import_job(job, imdb_ids, upload_digest, memory_cache, catalogue):
+    """Werk van de import-job; geeft (rijnummers in de catalogus, rapport).
+
+    De job bewaart zo alleen rijnummers, geen OMDb-records. Verouderde titels worden al
+    getoond en op de achtergrond ververst.
+    """
+    movies, report = run_import(imdb_ids, upload_digest, memory_cache, job.advance)
+    if report["stale_ids"]:
+        schedule_refresh(report["stale_ids"], memory_cache)
+    return catalogue.add_many(movies), report
+
+def get_cached_movie_data(imdb_ids, upload_digest):
+    """Start de import-job voor deze upload of haak in op de lopende; geeft (rijnummers, rapport) als hij klaar is.
+
+    Zolang de job loopt toont de pagina de voortgang en draait ze elke seconde opnieuw.
+    """
+    memory_cache = get_memory_cache()
+    catalogue = get_catalogue()
+    job = start_import_job(
+        upload_digest, len(imdb_ids), lambda job: run_import_job(job, imdb_ids, upload_digest, memory_cache, catalogue)
+    )
+    if job.status == RUNNING:
+        done, total = job.progress()
+        st.progress(
+            done / (total or 1),
+            text=f"📥 Films ophalen via permanente Cloud Cache: {done}/{total} (gaat op de achtergrond door, ook als je de pagina verlaat)",
+        )
+        time.sleep(IMPORT_POLL_SECONDS)
+        st.rerun()
+    if job.status == FAILED:
+        discard_import_job(upload_digest)
+        st.error(f"❌ Ophalen van de films mislukt: {job.error}")
+        st.stop()
+    return job.result
+
+def show_import_report(report):
+    if report["stale_ids"]:
+        st.caption(f"🔄 {len(report['stale_ids'])} verouderde titels worden op de achtergrond ververst")
         
-        if data_en.get('Response') != 'True':
-            return {}
-            
-        # Stap 2: Probeer de Nederlandse vertaling van het plot op te halen en erin te patchen
+    if report["errors"]:
+        st.error("⚠️ Er ging iets mis met de permanente cache:")
+        for err in report["errors"][:5]:
+            st.code(err)
+
+    if report["deferred"]:
+        st.warning(quota_message(OMDB_API_KEY, report["deferred"]))
+
+    if report["failed"]:
+        st.warning(f"⚠️ {report['failed']} titels konden niet opgehaald worden; een volgende load probeert ze opnieuw.")
+        
+    memory_stats = get_memory_cache().stats()
+    st.caption(
+        f"🧠 Geheugencache: {memory_stats['items']} titels · {memory_stats['hits']} hits · {memory_stats['misses']} missers"
+    )
+
+    if report["new"] > 0 and use_redis:
+        st.success(f"✅ {report['new']} titels succesvol hersteld en vernieuwd in de cloud cache!")
+    elif report["new"] > 0 and use_sqlite:
+        st.success(f"✅ {report['new']} titels opgeslagen in de lokale cache!")
+    elif not report["errors"] and not report["deferred"] and not report["failed"]:
+        st.info("ℹ️ Alle films stonden al veilig in de cache!")
+
+# ------------------------------
+# 🎯 Lazy "pick-first" modus: alleen getoonde titels ophalen
+# ------------------------------
+PREFETCH_AHEAD = int(os.getenv("PREFETCH_AHEAD", "3"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+MAX_PICK_SKIPS = 10  # Titels zonder OMDb-data die een selectie hooguit overslaat
+
+@st.cache_resource
+def get_prefetcher():
+    """Proces-brede threadpool met de lopende prefetches per IMDb ID"""
+    return {
+        "executor": ThreadPoolExecutor(max_workers=PREFETCH_WORKERS),
+        "pending": {},
+        "lock": threading.Lock(),
+    }
+
+POSTER_CACHE_MAX_ITEMS = 300
+POSTER_CACHE_TTL_SECONDS = 24 * 60 * 60  # 1 dag
+
+@st.cache_resource
+def get_poster_cache():
+    """Proces-brede LRU met poster-bytes, gevuld door de prefetcher"""
+    return MemoryLRUCache(POSTER_CACHE_MAX_ITEMS, POSTER_CACHE_TTL_SECONDS)
+
+def load_poster(poster_url, poster_cache):
+    if not poster_url or poster_url == "N/A":
+        return None
+    poster = poster_cache.get_many([poster_url]).get(poster_url)
+    if poster is None:
         try:
-            url_nl = f"http://www.omdbapi.com/?i={imdb_id}&apikey={OMDB_API_KEY}&plot=full&language=nl"
-            response_nl = requests.get(url_nl, timeout=10)
-            if response_nl.status_code == 200:
-                data_nl = response_nl.json()
-                if data_nl.get('Response') == 'True' and data_nl.get('Plot') and data_nl.get('Plot') != 'N/A':
-                    data_en['Plot'] = data_nl['Plot']
-        except Exception:
-            pass # Fallback naar Engelse beschrijving als NL niet beschikbaar is
-            
-        return data_en
+            response = http_get(poster_url)
+            response.raise_for_status()
+            poster = response.content
+            poster_cache.set(poster_url, poster)
+        except Exception as e:
+            print(f"Poster ophalen mislukt voor {poster_url}: {e}")
+    return poster
+
+def warm_extra(imdb_id, warm):
+    try:
+        warm()
     except Exception as e:
-        print(f"OMDb Fetch Error voor {imdb_id}: {e}")
+        print(f"Prefetch fout voor {imdb_id}: {e}")
+
+def warm_pick(imdb_id, movie_data, memory_cache, poster_cache, executor):
+    """Maak alles klaar wat de kaart van een pick nodig heeft: data, trailer, nudity-rating en poster.
+
+    Alleen de data hoort bij deze taak; trailer, rating en poster gaan elk als eigen taak
+    de pool in, zodat wie op de data wacht niet ook op de scrapers wacht.
+    """
+    if not movie_data:
+        movie_data = load_movie(imdb_id, memory_cache)
+    if not movie_data:
         return {}
+    for warm in (
+        lambda: find_youtube_trailer(movie_data.get('Title'), movie_data.get('Year'), imdb_id),
+        lambda: load_sex_nudity_rating(imdb_id),
+        lambda: load_poster(movie_data.get('Poster'), poster_cache),
+    ):
+        executor.submit(warm_extra, imdb_id, warm)
+    return movie_data
+
+def prefetch_picks(picks, memory_cache):
+    """Start op de achtergrond het klaarzetten van de picks [(imdb_id, data of None)] die hierna komen"""
+    prefetcher = get_prefetcher()
+    poster_cache = get_poster_cache()
+    with prefetcher["lock"]:
+        pending = prefetcher["pending"]
+        for imdb_id in [key for key, future in pending.items() if future.done()]:
+            del pending[imdb_id]
+        for imdb_id, movie_data in picks:
+            if imdb_id not in pending:
+                pending[imdb_id] = prefetcher["executor"].submit(
+                    warm_pick, imdb_id, movie_data, memory_cache, poster_cache, prefetcher["executor"]
+                )
 
-def get_cached_movie_data(imdb_ids):
-    """Haal films op uit cloud cache of OMDb met automatische herstelfunctie voor corrupte records"""
-    movies_data = []
-    new_movies_count = 0
-    redis_errors = []
-    
-    with st.spinner("Films ophalen via permanente Cloud Cache..."):
-        progress = st.progress(0)
-        
-        for i, imdb_id in enumerate(imdb_ids):
-            movie_data = None
-            
-            # 1. Probeer eerst uit Upstash Redis te halen
-            if use_redis:
-                try:
-                    cached_data = redis.get(f"movie:{imdb_id}")
-                    if cached_data:
-                        potential_data = json.loads(cached_data)
-                        # AUTOMATISCHE HERSTELLER: Als de gecachte data geen ratings bevat (oude language=nl bug),
-                        # negeren we de cache zodat hij live compleet opnieuw wordt opgebouwd.
-                        if isinstance(potential_data, dict) and len(potential_data.get("Ratings", [])) > 0:
-                            movie_data = potential_data
-                except Exception as e:
-                    error_msg = f"Leesfout voor {imdb_id}: {str(e)}"
-                    if error_msg not in redis_errors:
-                        redis_errors.append(error_msg)
-
-            # 2. Niet (of incompleet) in de cache gevonden? Haal live op bij OMDb
-            if not movie_data:
-                movie_data = get_movie_data_uncached(imdb_id)
-                if movie_data and movie_data.get('Response') == 'True':
-                    movies_data.append((imdb_id, movie_data))
-                    new_movies_count += 1
-                    
-                    # Sla de gecorrigeerde, complete data op in Upstash
-                    if use_redis:
-                        try:
-                            serialized_data = json.dumps(movie_data)
-                            redis.set(f"movie:{imdb_id}", serialized_data, ex=CACHE_TTL_SECONDS)
-                        except Exception as e:
-                            error_msg = f"Schrijffout voor {imdb_id}: {str(e)}"
-                            if error_msg not in redis_errors:
-                                redis_errors.append(error_msg)
-            else:
-                movies_data.append((imdb_id, movie_data))
-                
-            progress.progress((i + 1) / len(imdb_ids))
-            
-        progress.empty()
-        
-    if redis_errors:
-        st.error("⚠️ Er ging iets mis met de Upstash Cloud Cache verbinding:")
-        for err in redis_errors[:5]:
-            st.code(err)
-        
-    if new_movies_count > 0 and use_redis:
-        st.success(f"✅ {new_movies_count} titels succesvol hersteld en vernieuwd in de cloud cache!")
-    elif use_redis and not redis_errors:
-        st.info("ℹ️ Alle films stonden al veilig in de cloud cache!")
-        
-    return movies_data
+def get_movie_for_pick(imdb_id, memory_cache):
+    """Data voor de gekozen titel; wacht op een lopende prefetch (alleen de data) in plaats van dubbel op te halen"""
+    prefetcher = get_prefetcher()
+    with prefetcher["lock"]:
+        future = prefetcher["pending"].get(imdb_id)
+    if future is not None:
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Prefetch fout voor {imdb_id}: {e}")
+    return load_movie(imdb_id, memory_cache)
+
+def draw_from_deck(pool):
+    """Trek de volgende index uit de geschudde kaartenbak; schud opnieuw als hij leeg is"""
+    if not st.session_state.available_indices:
+        st.session_state.available_indices = array('I', pool)
+        random.shuffle(st.session_state.available_indices)
+    return st.session_state.available_indices.pop()
 
 # ------------------------------
-# 🔎 Extract IMDb IDs
+# #️⃣ Upload-hash: reruns en her-uploads van hetzelfde bestand hergebruiken
 # ------------------------------
-def extract_imdb_ids(df):
-    imdb_ids = set()
-    pattern = re.compile(r'(tt\d{7,10})')
-    for col in df.columns:
-        try:
-            for cell in df[col].astype(str):
-                matches = pattern.findall(cell)
-                for match in matches:
-                    imdb_ids.add(match)
-        except:
-            continue
-    return list(imdb_ids)
+UPLOAD_MEMO_MAX_ITEMS = 32
+UPLOAD_MEMO_TTL_SECONDS = 24 * 60 * 60  # 1 dag
+
+@st.cache_resource
+def get_upload_memo():
+    """Proces-brede memo: upload-hash -> {"imdb_ids": [...], "rows": array met rijen in de catalogus}"""
+    return MemoryLRUCache(UPLOAD_MEMO_MAX_ITEMS, UPLOAD_MEMO_TTL_SECONDS)
+
+def get_upload_digest(uploaded_file):
+    """SHA-256 van de geüploade bytes; één keer per upload berekend en in de sessie bewaard"""
+    file_id = getattr(uploaded_file, "file_id", None)
+    cached = st.session_state.get("upload_digest_for")
+    if file_id is not None and cached and cached[0] == file_id:
+        return cached[1]
+    digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    st.session_state.upload_digest_for = (file_id, digest)
+    return digest
+
+# ------------------------------
+# 🗃️ Gedeelde catalogus + media type filter (in geheugen)
+# ------------------------------
+@st.cache_resource
+def get_catalogue():
+    """Proces-brede kolomgewijze catalogus (zie catalogue.py); sessies bewaren alleen rijnummers"""
+    return MovieCatalogue()
+
+MEDIA_TYPE_FILTERS = {"Alleen films": "movie", "Alleen series": "series"}
+
+def filter_catalogue_indices(catalogue, rows, media_type):
+    """Rijen van de upload die bij het gekozen media type passen"""
+    wanted_type = MEDIA_TYPE_FILTERS.get(media_type)
+    if wanted_type is None:
+        return array('I', rows)
+    return catalogue.rows_of_type(rows, wanted_type)
 
 # ------------------------------
 # 🍅 Rotten Tomatoes extractor
@@ -160,67 +261,11 @@ def extract_rotten_tomatoes_score(movie):
     return "N/A"
 
 # ------------------------------
-# 🎥 Find YouTube trailer
+# 🔞 IMDb Parental Guide: Sex & Nudity (parser in parental_guide.py)
 # ------------------------------
-def find_youtube_trailer(title, year):
-    try:
-        query = f"{title} {year} official trailer site:youtube.com"
-        search_url = f"https://www.youtube.com/results?search_query={requests.utils.quote(query)}"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(search_url, headers=headers, timeout=15)
-        video_ids = re.findall(r'watch\?v=(\S{11})', response.text)
-        if video_ids:
-            return f"https://www.youtube.com/watch?v={video_ids[0]}"
-        return None
-    except:
-        return None
-    
-# 🔞 IMDb Parental Guide: Sex & Nudity (Diepe regex-omzeiling voor gegarandeerde vangst)
 @st.cache_data(show_spinner=False, ttl=3600)
 def get_sex_nudity_rating(imdb_id):
-    try:
-        url = f"https://www.imdb.com/title/{imdb_id}/parentalguide"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9"
-        }
-        r = requests.get(url, headers=headers, timeout=12)
-        r.raise_for_status()
-        html = r.text
-
-        # 1. Directe bliksem-regex in de rauwe ingebedde JSON-string (ongeacht hoe diep IMDb het nest)
-        raw_match1 = re.search(r'"advisoryCategory"\s*:\s*"SEX_AND_NUDITY".*?"text"\s*:\s*"([A-Za-z]+)"', html, re.DOTALL)
-        if raw_match1:
-            return raw_match1.group(1).strip().capitalize()
-            
-        raw_match2 = re.search(r'"id"\s*:\s*"SEX_AND_NUDITY".*?"severity"\s*:\s*"([A-Za-z]+)"', html, re.DOTALL)
-        if raw_match2:
-            return raw_match2.group(1).strip().capitalize()
-
-        # 2. Klassieke HTML element fallbacks
-        patterns = [
-            r'data-testid="advisory-severity-item-SEX_AND_NUDITY"[^>]*>\s*<span[^>]*>(Mild|Moderate|Severe|None)</span',
-            r'Sex & Nudity</h4>[^>]*>\s*<span[^>]*>(.*?)</span',
-            r'Sex & Nudity</h4>[^>]*>(.*?)</div',
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
-            if match:
-                res = match.group(1).strip().capitalize()
-                if res in ['Mild', 'Moderate', 'Severe', 'None']:
-                    return res
-
-        # 3. Check op tekstsectie (voor series/afleveringen zonder hoofd-label)
-        if "Sex & Nudity" in html:
-            sex_section = html.split("Sex & Nudity")[1][:1200]
-            for level in ['Severe', 'Moderate', 'Mild', 'None']:
-                if level.lower() in sex_section.lower():
-                    return level
-
-        return "Onbekend"
-        
-    except Exception:
-        return "Onbekend"
+    return load_sex_nudity_rating(imdb_id)
 
 # ------------------------------
 # 🚀 UI
@@ -235,83 +280,133 @@ uploaded_file = st.file_uploader("📤 Upload CSV-bestand", type=["csv"])
 
 if uploaded_file:
     try:
-        try:
-            df = pd.read_csv(uploaded_file)
-        except UnicodeDecodeError:
-            uploaded_file.seek(0)
-            content = uploaded_file.read().decode('latin-1')
-            df = pd.read_csv(StringIO(content))
-
-        imdb_ids = extract_imdb_ids(df)
+        upload_digest = get_upload_digest(uploaded_file)
+        upload_memo = get_upload_memo()
+        upload_entry = upload_memo.get_many([upload_digest]).get(upload_digest)
+        if upload_entry is None:
+            # Scan de ruwe bytes; geen DataFrame en geen aparte latin-1 fallback nodig
+            upload_entry = {"imdb_ids": extract_imdb_ids(uploaded_file), "rows": None}
+            upload_memo.set(upload_digest, upload_entry)
+        imdb_ids = upload_entry["imdb_ids"]
         if not imdb_ids:
             st.warning("⚠️ Geen IMDb ID's gevonden.")
             st.stop()
 
         st.success(f"✅ {len(imdb_ids)} unieke IMDb ID's gevonden in het bestand!")
         media_type = st.selectbox("📺 Wat wil je kijken?", ["Alles", "Alleen films", "Alleen series"])
+        lazy_mode = st.toggle(
+            "⚡ Snel starten (alleen de getoonde titels ophalen)",
+            value=True,
+            help="Bij 'Alles' wordt niet eerst de hele lijst verrijkt; het filter op type heeft wel de volledige lijst nodig.",
+        )
+
+        # Volledige verrijking alleen als een filter ze nodig heeft (of als ze er al is)
+        memory_cache = get_memory_cache()
+        catalogue = get_catalogue()
+        use_catalogue = not lazy_mode or media_type != "Alles" or upload_entry["rows"] is not None
+        pick_source = "catalogue" if use_catalogue else "lazy"
+        if st.session_state.get("pick_source") != pick_source:
+            st.session_state.pick_source = pick_source
+            st.session_state.pop("last_media_type", None)
+            st.session_state.pop("available_indices", None)
+            st.session_state.pop("last_selected_idx", None)
+
+        if use_catalogue:
+            # ---------- Data ophalen (één keer per upload, los van de filters) ----------
+            if "catalogue_rows" not in st.session_state or st.session_state.get("catalogue_digest") != upload_digest:
+                # Al eerder verrijkt (ook in een andere sessie)? Dan meteen hergebruiken.
+                # De sessie houdt alleen rijnummers vast; de kolommen staan in de gedeelde catalogus.
+                catalogue_rows = upload_entry["rows"]
+                if catalogue_rows is None:
+                    # Loopt de import nog, dan toont dit de voortgang en start het script opnieuw
+                    catalogue_rows, report = get_cached_movie_data(imdb_ids, upload_digest)
+                    show_import_report(report)
+                    if report["deferred"] or report["failed"]:
+                        # Onvolledig (quotum of fetch-fouten)? Niet onthouden, zodat een volgende load de rest ophaalt
+                        discard_import_job(upload_digest)
+                    else:
+                        upload_entry["rows"] = catalogue_rows
+                st.session_state.catalogue_digest = upload_digest
+                st.session_state.catalogue_rows = catalogue_rows
+                # Nieuwe catalogus: de filter-view moet opnieuw opgebouwd worden
+                st.session_state.pop("last_media_type", None)
+
+            # ---------- Filter: index-view over de catalogus, zonder netwerkverkeer ----------
+            if st.session_state.get("last_media_type") != media_type:
+                st.session_state.last_media_type = media_type
+                st.session_state.view_indices = filter_catalogue_indices(
+                    catalogue, st.session_state.catalogue_rows, media_type
+                )
 
-        # ---------- Data ophalen ----------
-        rebuild = False
-        if "all_data" not in st.session_state:
-            rebuild = True
-        elif st.session_state.get("last_media_type") != media_type:
-            rebuild = True
-        elif st.session_state.get("last_imdb_ids") != imdb_ids:
-            rebuild = True
-
-        if rebuild:
-            st.session_state.last_imdb_ids = imdb_ids
-            st.session_state.last_media_type = media_type
-            
-            all_movies_data = get_cached_movie_data(imdb_ids)
-            
-            if media_type == "Alleen films":
-                st.session_state.all_data = [
-                    item for item in all_movies_data if item[1].get("Type") == "movie"
-                ]
-            elif media_type == "Alleen series":
-                st.session_state.all_data = [
-                    item for item in all_movies_data if item[1].get("Type") == "series"
-                ]
-            else:
-                st.session_state.all_data = all_movies_data
-
-            # CRUCIALE BUGFIX: Verwijder de oude kaartenbak direct bij een filter- of datawijziging
-            # Hierdoor matched de willekeurige selectie ALTIJD met de nieuwe lengte van de lijst!
-            if "available_indices" in st.session_state:
-                del st.session_state.available_indices
-            if "last_selected_idx" in st.session_state:
-                del st.session_state.last_selected_idx
-
-        if not st.session_state.all_data:
-            st.warning("⚠️ Geen titels gevonden met dat type.")
-            st.stop()
+                # CRUCIALE BUGFIX: Verwijder de oude kaartenbak direct bij een filter- of datawijziging
+                # Hierdoor matched de willekeurige selectie ALTIJD met de nieuwe view!
+                if "available_indices" in st.session_state:
+                    del st.session_state.available_indices
+                if "last_selected_idx" in st.session_state:
+                    del st.session_state.last_selected_idx
+
+            if not st.session_state.view_indices:
+                st.warning("⚠️ Geen titels gevonden met dat type.")
+                st.stop()
+            pick_pool = st.session_state.view_indices
+        else:
+            # ---------- Lazy: de kaartenbak loopt rechtstreeks over de ruwe ID-lijst ----------
+            if st.session_state.get("lazy_digest") != upload_digest:
+                st.session_state.lazy_digest = upload_digest
+                st.session_state.pop("available_indices", None)
+                st.session_state.pop("last_selected_idx", None)
+            pick_pool = range(len(imdb_ids))
 
         # ---------- Random selectie ----------
+        # De kaartenbak bevat rijen in de catalogus (of indices in de ID-lijst in lazy modus)
         if "available_indices" not in st.session_state:
-            st.session_state.available_indices = list(range(len(st.session_state.all_data)))
+            st.session_state.available_indices = array('I', pick_pool)
             random.shuffle(st.session_state.available_indices)
             st.balloons()
         
         if "last_selected_idx" not in st.session_state:
-            if st.session_state.available_indices:
-                st.session_state.last_selected_idx = st.session_state.available_indices.pop()
-            else:
-                st.session_state.available_indices = list(range(len(st.session_state.all_data)))
-                random.shuffle(st.session_state.available_indices)
-                st.session_state.last_selected_idx = st.session_state.available_indices.pop()
+            st.session_state.last_selected_idx = draw_from_deck(pick_pool)
 
         if st.button("🔁 Nieuwe selectie", type="primary"):
-            if st.session_state.available_indices:
-                st.session_state.last_selected_idx = st.session_state.available_indices.pop()
-            else:
-                st.session_state.available_indices = list(range(len(st.session_state.all_data)))
-                random.shuffle(st.session_state.available_indices)
-                st.session_state.last_selected_idx = st.session_state.available_indices.pop()
+            st.session_state.last_selected_idx = draw_from_deck(pick_pool)
             st.balloons()
 
-        chosen_id, movie = st.session_state.all_data[st.session_state.last_selected_idx]
-        trailer_url = find_youtube_trailer(movie.get('Title'), movie.get('Year'))
+        if use_catalogue:
+            # De volledige record komt uit de geheugencache (of Redis/SQLite), niet uit de sessie
+            chosen_id = catalogue.imdb_id(st.session_state.last_selected_idx)
+            movie = get_movie_for_pick(chosen_id, memory_cache)
+            if not movie:
+                if get_omdb_scheduler(OMDB_API_KEY).stats()["remaining"] == 0:
+                    st.warning(quota_message(OMDB_API_KEY))
+                else:
+                    st.warning("⚠️ Deze titel kon niet geladen worden; probeer een nieuwe selectie.")
+                st.stop()
+        else:
+            # Alleen de gekozen titel verrijken; ID's zonder OMDb-data worden overgeslagen
+            chosen_id = imdb_ids[st.session_state.last_selected_idx]
+            movie = get_movie_for_pick(chosen_id, memory_cache)
+            skipped = 0
+            scheduler = get_omdb_scheduler(OMDB_API_KEY)
+            while not movie and skipped < MAX_PICK_SKIPS and scheduler.stats()["remaining"] > 0:
+                skipped += 1
+                st.session_state.last_selected_idx = draw_from_deck(pick_pool)
+                chosen_id = imdb_ids[st.session_state.last_selected_idx]
+                movie = get_movie_for_pick(chosen_id, memory_cache)
+            if not movie:
+                if scheduler.stats()["remaining"] == 0:
+                    st.warning(quota_message(OMDB_API_KEY))
+                else:
+                    st.warning("⚠️ Geen titels gevonden via OMDb; probeer een nieuwe selectie.")
+                st.stop()
+
+        # Houd de volgende picks uit de kaartenbak alvast warm (data, trailer, nudity en poster)
+        upcoming = list(reversed(st.session_state.available_indices[-PREFETCH_AHEAD:]))
+        if use_catalogue:
+            prefetch_picks([(catalogue.imdb_id(row), None) for row in upcoming], memory_cache)
+        else:
+            prefetch_picks([(imdb_ids[i], None) for i in upcoming], memory_cache)
+
+        trailer_url = find_youtube_trailer(movie.get('Title'), movie.get('Year'), chosen_id)
 
         # ---------- MODERN CARD ONTWERP ----------
         st.markdown("---")
@@ -336,7 +431,9 @@ if uploaded_file:
             with col1:
                 poster = movie.get('Poster')
                 if poster and poster != "N/A":
-                    st.image(poster, use_column_width=True)
+                    # Voorgeladen bytes gebruiken als de prefetcher de poster al binnen heeft
+                    poster_bytes = get_poster_cache().get_many([poster]).get(poster)
+                    st.image(poster_bytes or poster, use_column_width=True)
                 else:
                     st.warning("Geen poster beschikbaar")
                     
@@ -0,0 +1,137 @@
+import re
+from http_stream import scan_stream
+from sqlite_cache import get_or_compute
+
+# ------------------------------
+# 🔞 IMDb Parental Guide: Sex & Nudity
+# ------------------------------
+# In plaats van meerdere DOTALL-regexen over de hele pagina te laten lopen, zoeken we
+# met str.find het ingebedde __NEXT_DATA__ JSON-blok en daarbinnen alleen het stukje
+# rond SEX_AND_NUDITY. Elke regex draait op een venster van hooguit een paar KB.
+
+PARENTAL_GUIDE_TTL_SECONDS = 180 * 24 * 60 * 60  # 180 dagen: ratings veranderen zelden
+PARENTAL_GUIDE_MISS_TTL_SECONDS = 3 * 24 * 60 * 60  # 3 dagen: misschien krijgt de titel later nog een rating
+SEVERITY_LEVELS = ("None", "Mild", "Moderate", "Severe")
+UNKNOWN_RATING = "Onbekend"
+
+NEXT_DATA_MARKER = 'id="__NEXT_DATA__"'
+JSON_CATEGORY_MARKER = '"SEX_AND_NUDITY"'
+HTML_CATEGORY_MARKER = 'advisory-severity-item-SEX_AND_NUDITY'
+TEXT_SECTION_MARKER = "Sex & Nudity"
+SECTION_WINDOW = 2000
+TEXT_SECTION_WINDOW = 1200
+
+SEVERITY_IN_JSON = re.compile(r'"(?:severity|text)"\s*:\s*"(None|Mild|Moderate|Severe)"', re.IGNORECASE)
+SEVERITY_IN_HTML = re.compile(r'>\s*(None|Mild|Moderate|Severe)\s*<', re.IGNORECASE)
+SEVERITY_WORD = re.compile(r'\b(Severe|Moderate|Mild|None)\b', re.IGNORECASE)
+
+
+def normalize_severity(value):
+    value = value.strip().capitalize()
+    return value if value in SEVERITY_LEVELS else None
+
+
+def find_next_data(html):
+    """(start, einde) van de inhoud van het __NEXT_DATA__ script, of None"""
+    marker = html.find(NEXT_DATA_MARKER)
+    if marker == -1:
+        return None
+    start = html.find(">", marker)
+    end = html.find("</script>", start)
+    if start == -1 or end == -1:
+        return None
+    return start + 1, end
+
+
+def extract_sex_nudity_rating(html):
+    """Sex & Nudity-niveau uit de HTML van een parental guide pagina, of "Onbekend" """
+    # 1. Ingebedde JSON: alleen het venster na de eerste SEX_AND_NUDITY-vermelding bekijken
+    bounds = find_next_data(html)
+    if bounds:
+        start, end = bounds
+        position = html.find(JSON_CATEGORY_MARKER, start, end)
+        while position != -1:
+            window_end = min(position + SECTION_WINDOW, end)
+            match = SEVERITY_IN_JSON.search(html, position, window_end)
+            if match:
+                return normalize_severity(match.group(1))
+            position = html.find(JSON_CATEGORY_MARKER, position + len(JSON_CATEGORY_MARKER), end)
+
+    # 2. Gerenderde HTML (oudere paginaversies zonder bruikbare JSON)
+    position = html.find(HTML_CATEGORY_MARKER)
+    if position != -1:
+        match = SEVERITY_IN_HTML.search(html, position, position + SECTION_WINDOW)
+        if match:
+            return normalize_severity(match.group(1))
+
+    # 3. Tekstsectie (voor series/afleveringen zonder hoofd-label)
+    return text_section_rating(html) or UNKNOWN_RATING
+
+
+def text_section_rating(html):
+    """Zwaarste niveau in de TEXT_SECTION_WINDOW tekens na de eerste "Sex & Nudity", of None"""
+    position = html.find(TEXT_SECTION_MARKER)
+    if position == -1:
+        return None
+    start = position + len(TEXT_SECTION_MARKER)
+    levels = {match.group(1).capitalize() for match in SEVERITY_WORD.finditer(html, start, start + TEXT_SECTION_WINDOW)}
+    for level in ("Severe", "Moderate", "Mild", "None"):
+        if level in levels:
+            return level
+    return None
+
+
+PARENTAL_GUIDE_MAX_BYTES = 2 * 1024 * 1024
+PARENTAL_GUIDE_KEEP_CHARS = 2 * SECTION_WINDOW
+
+
+def scan_for_sex_nudity(buffer, eof):
+    """Streaming-variant: stop zodra het SEX_AND_NUDITY-blok (met volledig venster) binnen is"""
+    for marker, pattern in ((JSON_CATEGORY_MARKER, SEVERITY_IN_JSON), (HTML_CATEGORY_MARKER, SEVERITY_IN_HTML)):
+        position = buffer.find(marker)
+        if position == -1:
+            continue
+        match = pattern.search(buffer, position, position + SECTION_WINDOW)
+        if match:
+            return normalize_severity(match.group(1)) or UNKNOWN_RATING
+        if not eof and len(buffer) < position + SECTION_WINDOW:
+            return None  # Venster nog niet compleet: wacht op het volgende blok
+    if eof:
+        return extract_sex_nudity_rating(buffer)
+    # Tekstsectie pas na de gestructureerde markers, en alleen met een volledig venster
+    position = buffer.find(TEXT_SECTION_MARKER)
+    if position != -1 and len(buffer) >= position + len(TEXT_SECTION_MARKER) + TEXT_SECTION_WINDOW:
+        return text_section_rating(buffer)
+    return None
+
+
+def scrape_sex_nudity_rating(imdb_id):
+    """Sex & Nudity-rating van de parental guide, of "Onbekend" als de pagina er geen heeft.
+
+    Gooit een exception bij netwerkfouten, zodat die niet als "geen rating" gecachet worden.
+    """
+    url = f"https://www.imdb.com/title/{imdb_id}/parentalguide"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept-Language": "en-US,en;q=0.9"
+    }
+    return scan_stream(
+        url, scan_for_sex_nudity, PARENTAL_GUIDE_MAX_BYTES, PARENTAL_GUIDE_KEEP_CHARS,
+        headers=headers, timeout=12,
+    ) or UNKNOWN_RATING
+
+
+def load_sex_nudity_rating(imdb_id):
+    """Sex & Nudity-rating via de lokale cache.
+
+    Een gevonden rating blijft lang bewaard, "geen rating" kort (zoals een gemiste trailer);
+    bij een netwerkfout komt "Onbekend" terug zonder cache, de volgende keer opnieuw proberen.
+    """
+    try:
+        return get_or_compute(
+            f"nudity:{imdb_id}",
+            lambda rating: PARENTAL_GUIDE_MISS_TTL_SECONDS if rating == UNKNOWN_RATING else PARENTAL_GUIDE_TTL_SECONDS,
+            lambda: scrape_sex_nudity_rating(imdb_id),
+        )
+    except Exception:
+        return UNKNOWN_RATING
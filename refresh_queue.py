@@ -0,0 +1,85 @@
+import os
+import queue
+import threading
+import time
+
+# ------------------------------
+# 🔄 Stale-while-revalidate: achtergrondverversing met begrensde doorvoer
+# ------------------------------
+# Verouderde cache-records worden meteen getoond en hier in de wachtrij gezet. Eén
+# worker-thread ververst ze één voor één, met een maximum aantal per minuut, zodat een
+# grote watchlist de API niet in één keer leegtrekt. Een key die al in de wachtrij
+# staat wordt niet nog eens toegevoegd; is de wachtrij vol, dan komt hij bij een
+# volgende load wel aan de beurt.
+
+
+def refresh_per_minute():
+    return int(os.getenv("REFRESH_PER_MINUTE", "30"))
+
+
+def refresh_max_pending():
+    return int(os.getenv("REFRESH_MAX_PENDING", "1000"))
+
+
+
+class RefreshQueue:
+    """Thread-safe wachtrij van (key, refresh-functie) met deduplicatie en rate limit"""
+
+    def __init__(self, per_minute=None, max_pending=None):
+        self.interval = 60 / max(1, per_minute or refresh_per_minute())
+        self.pending = queue.Queue(maxsize=max_pending or refresh_max_pending())
+        self.queued = set()
+        self.lock = threading.Lock()
+        self.refreshed = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, key, refresh):
+        """Zet `refresh()` in de wachtrij; False als de key al wacht of de wachtrij vol is"""
+        with self.lock:
+            if key in self.queued:
+                return False
+            try:
+                self.pending.put_nowait((key, refresh))
+            except queue.Full:
+                return False
+            self.queued.add(key)
+            return True
+
+    def stats(self):
+        with self.lock:
+            return {"pending": len(self.queued), "refreshed": self.refreshed, "failed": self.failed}
+
+    def _run(self):
+        next_slot = time.monotonic()
+        while True:
+            key, refresh = self.pending.get()
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_slot = time.monotonic() + self.interval
+            try:
+                succeeded = refresh() is not False
+            except Exception as e:
+                print(f"Verversen mislukt voor {key}: {e}")
+                succeeded = False
+            with self.lock:
+                self.queued.discard(key)
+                if succeeded:
+                    self.refreshed += 1
+                else:
+                    self.failed += 1
+
+
+_refresh_queue = None
+_refresh_queue_lock = threading.Lock()
+
+
+def get_refresh_queue():
+    """Proces-brede wachtrij; bewust geen st.cache_resource, want prefetch-threads gebruiken hem ook"""
+    global _refresh_queue
+    with _refresh_queue_lock:
+        if _refresh_queue is None:
+            _refresh_queue = RefreshQueue()
+        return _refresh_queue
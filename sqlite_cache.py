@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ------------------------------
+# 💾 Lokale permanente cache (SQLite, WAL-modus)
+# ------------------------------
+# Gebruikt als fallback wanneer Upstash niet geconfigureerd is, of als tweede laag
+# onder Redis (SQLITE_CACHE_WITH_REDIS=1). Waarden zijn strings (meestal JSON),
+# net als in Redis, zodat beide lagen dezelfde records kunnen delen.
+
+
+def sqlite_cache_path():
+    return os.getenv("SQLITE_CACHE_PATH", "cache.sqlite3")
+
+
+def sqlite_cache_with_redis():
+    """SQLite ook als tweede laag onder Redis gebruiken (bij gebruik gelezen, na load_dotenv)"""
+    return os.getenv("SQLITE_CACHE_WITH_REDIS", "0") == "1"
+
+
+# SQLite staat maximaal 999 parameters per query toe in oudere versies
+SQLITE_MAX_VARIABLES = 900
+
+
+class SQLiteCache:
+    """Key/value cache met TTL op schijf; veilig te gebruiken vanuit meerdere threads"""
+
+    def __init__(self, path=None):
+        path = path or sqlite_cache_path()
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL"
+            ")"
+        )
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Geeft {key: value} terug voor alle keys die nog niet verlopen zijn"""
+        found = {}
+        now = time.time()
+        keys = list(keys)
+        with self.lock:
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, now),
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl):
+        """Schrijft alle items in één transactie weg met dezelfde TTL (in seconden)"""
+        expires_at = time.time() + ttl
+        rows = [(key, value, expires_at) for key, value in items.items()]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    rows,
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def increment(self, key, ttl, amount=1, limit=None):
+        """Verhoog een teller atomisch (ook tussen processen) met hooguit `amount`, zonder `limit` te passeren.
+
+        Geeft (toegekend, nieuwe stand) terug; toegekend is 0 als de limiet al bereikt is.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")  # Schrijflock meteen: geen twee processen tegelijk
+            try:
+                row = self.conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+                count = int(row[0]) if row else 0
+                granted = amount if limit is None else max(0, min(amount, limit - count))
+                if not granted:
+                    self.conn.execute("ROLLBACK")
+                    return 0, count
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, str(count + granted), time.time() + ttl),
+                )
+                self.conn.execute("COMMIT")
+                return granted, count + granted
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key):
+        with self.lock:
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        """Verwijder verlopen rijen (lezen slaat ze al over); geeft het aantal terug"""
+        with self.lock:
+            return self.conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+    """Eén gedeelde SQLiteCache per proces (blijft bestaan over Streamlit reruns heen).
+
+    Bij het openen worden verlopen rijen één keer opgeruimd, zodat het bestand niet
+    blijft groeien met records die nooit meer gelezen worden.
+    """
+    global _local_cache
+    with _local_cache_lock:
+        if _local_cache is None:
+            _local_cache = SQLiteCache()
+            try:
+                _local_cache.purge_expired()
+            except Exception as e:
+                print(f"Opruimen lokale cache mislukt: {e}")
+        return _local_cache
+
+
+def get_or_compute(key, ttl, compute, should_cache=lambda value: value is not None):
+    """Lees een string-waarde uit de lokale cache, of bereken en bewaar ze bij een misser.
+
+    `ttl` mag ook een functie van de waarde zijn (bv. korter voor "niets gevonden"). Een
+    exception uit compute wordt niet gecachet en gaat door naar de aanroeper.
+    """
+    cache = get_local_cache()
+    try:
+        cached = cache.get(key)
+    except Exception as e:
+        print(f"Leesfout lokale cache voor {key}: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+    value = compute()
+    if should_cache(value):
+        try:
+            cache.set(key, value, ttl(value) if callable(ttl) else ttl)
+        except Exception as e:
+            print(f"Schrijffout lokale cache voor {key}: {e}")
+    return value
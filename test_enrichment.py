@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import enrichment
+import http_client
+import sqlite_cache
+from omdb_quota import get_omdb_scheduler
+from tmdb_cache import cached_tmdb_catalogue, fetch_tmdb_titles
+
+# Tests voor de async verrijkingspipeline tegen een lokale nep-server voor OMDb en TMDb.
+# Draaien met: python -m pytest -q test_enrichment.py
+
+NOT_FOUND_ID = "tt0000404"
+FAILING_ID = "tt0000500"
+
+
+class StandInServer:
+    """Lokale HTTP-server die OMDb (/omdb/) en TMDb (/3/...) nadoet en meet hoeveel calls er tegelijk lopen"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = {"omdb": 0, "tmdb": 0}
+        self.max_in_flight = {"omdb": 0, "tmdb": 0}
+        self.calls = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                api = "omdb" if url.path.startswith("/omdb") else "tmdb"
+                with server.lock:
+                    server.calls.append((api, url.path, parse_qs(url.query)))
+                    server.in_flight[api] += 1
+                    server.max_in_flight[api] = max(server.max_in_flight[api], server.in_flight[api])
+                try:
+                    body = server.respond(api, url.path, parse_qs(url.query))
+                finally:
+                    with server.lock:
+                        server.in_flight[api] -= 1
+                data = json.dumps(body).encode()
+                self.send_response(500 if body is None else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def respond(self, api, path, query):
+        if api == "omdb":
+            imdb_id = query["i"][0]
+            # Latere ID's antwoorden sneller: de volgorde van afronden wijkt af van de invoer
+            time.sleep(self.delay * (1 + (100 - int(imdb_id[2:]) % 100) / 50))
+            if imdb_id == NOT_FOUND_ID:
+                return {"Response": "False", "Error": "Incorrect IMDb ID."}
+            plot = "NL plot" if query.get("language") == ["nl"] else "EN plot"
+            return {
+                "Response": "True", "imdbID": imdb_id, "Title": f"Film {imdb_id}", "Plot": plot,
+                "Ratings": [{"Source": "Rotten Tomatoes", "Value": "90%"}],
+            }
+        time.sleep(self.delay)
+        if path.endswith(f"/find/{FAILING_ID}"):
+            return None  # 500: tijdelijke fout
+        if path.endswith(f"/find/{NOT_FOUND_ID}"):
+            return {"movie_results": [], "tv_results": []}
+        if "/find/" in path:
+            return {"movie_results": [{"id": 7, "title": f"Film {path.rsplit('/', 1)[1]}", "release_date": "2001-01-01"}]}
+        return {"id": 7, "runtime": 99, "genres": [], "credits": {"crew": [], "cast": []}, "videos": {"results": []}}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    stand_in = StandInServer()
+    monkeypatch.setattr(enrichment, "OMDB_URL", f"{stand_in.base_url}/omdb/")
+    monkeypatch.setattr(enrichment, "TMDB_URL", f"{stand_in.base_url}/3")
+    monkeypatch.setattr(sqlite_cache, "_local_cache", sqlite_cache.SQLiteCache(str(tmp_path / "cache.sqlite3")))
+    # Eigen key per test: een verse quotum-scheduler, zonder wachten op tokens
+    api_key = uuid.uuid4().hex
+    monkeypatch.setenv("OMDB_API_KEY", api_key)
+    monkeypatch.setenv("TMDB_API_KEY", "tmdb-key")
+    scheduler = get_omdb_scheduler(api_key)
+    scheduler.rate, scheduler.burst, scheduler.tokens = 10000.0, 1000, 1000.0
+    yield stand_in
+    stand_in.close()
+
+
+def set_concurrency(monkeypatch, api, limit):
+    limits = {**enrichment.api_concurrency(), api: limit}
+    monkeypatch.setattr(enrichment, "api_concurrency", lambda: limits)
+
+
+def omdb_calls(stand_in, imdb_id):
+    return [query for api, _, query in stand_in.calls if api == "omdb" and query["i"] == [imdb_id]]
+
+
+def test_omdb_results_follow_input_order(server):
+    imdb_ids = [f"tt{n:07d}" for n in range(1, 13)]
+    results = enrichment.run_enrichment(imdb_ids, "omdb")
+    assert [movie["imdbID"] for movie in results] == imdb_ids
+    assert all(movie["Plot"] == "NL plot" for movie in results)
+
+
+def test_on_result_reports_every_title(server):
+    imdb_ids = [f"tt{n:07d}" for n in range(1, 6)]
+    seen = []
+    enrichment.run_enrichment(imdb_ids, "omdb", on_result=lambda index, imdb_id, data: seen.append((index, imdb_id)))
+    assert sorted(seen) == list(enumerate(imdb_ids))
+
+
+def test_not_found_passes_through_with_one_call(server):
+    results = enrichment.run_enrichment(["tt0000001", NOT_FOUND_ID], "omdb")
+    assert results[1] == {"Response": "False", "Error": "Incorrect IMDb ID."}
+    assert len(omdb_calls(server, NOT_FOUND_ID)) == 1  # Geen NL-call voor een onbekend ID
+    assert len(omdb_calls(server, "tt0000001")) == 2
+
+
+def test_quota_exceeded_gives_none(server):
+    get_omdb_scheduler(enrichment.omdb_api_key()).daily_quota = 0
+    results = enrichment.run_enrichment(["tt0000001", "tt0000002"], "omdb")
+    assert results == [None, None]
+    assert not server.calls
+
+
+def test_tmdb_errors_are_retried_not_cached(server):
+    imdb_ids = ["tt0000001", NOT_FOUND_ID, FAILING_ID]
+    catalogue, missing = cached_tmdb_catalogue(imdb_ids)
+    assert fetch_tmdb_titles(catalogue, missing) == 1
+    assert catalogue[NOT_FOUND_ID] == {}  # Niet gevonden: blijft staan
+    assert FAILING_ID not in catalogue  # Fout: volgende keer opnieuw
+    _, missing = cached_tmdb_catalogue(imdb_ids, catalogue)
+    assert missing == [FAILING_ID]
+
+
+def test_tmdb_title_without_rt_score_is_not_cached(server):
+    get_omdb_scheduler(enrichment.omdb_api_key()).daily_quota = 0
+    catalogue, missing = cached_tmdb_catalogue(["tt0000001"])
+    assert fetch_tmdb_titles(catalogue, missing) == 0
+    assert catalogue["tt0000001"]["rt_score"] is None
+    assert "rt_pending" not in catalogue["tt0000001"]
+    assert cached_tmdb_catalogue(["tt0000001"]) == ({}, ["tt0000001"])
+
+
+def test_omdb_concurrency_cap(server, monkeypatch):
+    set_concurrency(monkeypatch, "omdb", 3)
+    enrichment.run_enrichment([f"tt{n:07d}" for n in range(1, 21)], "omdb")
+    assert 1 < server.max_in_flight["omdb"] <= 3
+
+
+def test_tmdb_concurrency_cap(server, monkeypatch):
+    monkeypatch.delenv("OMDB_API_KEY")  # Zonder OMDb-key geen Rotten Tomatoes-call
+    set_concurrency(monkeypatch, "tmdb", 4)
+    imdb_ids = [f"tt{n:07d}" for n in range(1, 21)]
+    results = enrichment.run_enrichment(imdb_ids, "tmdb")
+    assert [movie["imdb_id"] for movie in results] == imdb_ids
+    assert 1 < server.max_in_flight["tmdb"] <= 4
+    assert server.max_in_flight["omdb"] == 0
+
+
+def test_concurrency_never_exceeds_http_pool(monkeypatch):
+    # De knoppen worden bij gebruik gelezen: ook een waarde die na de import gezet is telt
+    monkeypatch.setenv("HTTP_POOL_SIZE", "2")
+    assert all(limit <= 2 for limit in enrichment.api_concurrency().values())
+
+
+def test_parallel_pipelines_share_the_host_limit(server, monkeypatch):
+    # Twee imports tegelijk, elk met ruimte voor 8 OMDb-calls: samen blijven ze binnen de host
+    set_concurrency(monkeypatch, "omdb", 8)
+    limit = http_client.host_limit(server.base_url.split("//")[1])
+    threads = [
+        threading.Thread(target=enrichment.run_enrichment, args=([f"tt{n:07d}" for n in range(start, start + 16)], "omdb"))
+        for start in (1, 101)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 1 < server.max_in_flight["omdb"] <= limit < 8
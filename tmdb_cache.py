@@ -0,0 +1,60 @@
+import json
+
+from enrichment import run_enrichment
+from sqlite_cache import get_local_cache
+
+# ------------------------------
+# 🗂️ TMDb-cache: lokale SQLite cache op IMDb ID (`tmdb:{imdb_id}`)
+# ------------------------------
+# Gedeeld door de TMDb-pagina en de CLI (warm_cache.py); geen st-calls. Het ophalen zelf
+# (/find, details en de RT-score via OMDb) zit in enrich_tmdb_title (enrichment.py).
+
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 dagen
+
+
+def cached_tmdb_catalogue(imdb_ids, known=None):
+    """Catalogue {imdb_id: data} uit `known` en de lokale cache; geeft (catalogue, ontbrekende ID's).
+
+    ID's uit `known` worden hergebruikt, ID's die niet meer in de lijst staan vallen weg.
+    """
+    known = known or {}
+    catalogue = {imdb_id: known[imdb_id] for imdb_id in imdb_ids if imdb_id in known}
+    new_ids = [imdb_id for imdb_id in imdb_ids if imdb_id not in catalogue]
+    if not new_ids:
+        return catalogue, []
+
+    try:
+        cached = get_local_cache().get_many([f"tmdb:{imdb_id}" for imdb_id in new_ids])
+    except Exception as e:
+        print(f"Leesfout lokale cache: {e}")
+        cached = {}
+    for imdb_id in new_ids:
+        if f"tmdb:{imdb_id}" in cached:
+            catalogue[imdb_id] = json.loads(cached[f"tmdb:{imdb_id}"])
+    return catalogue, [imdb_id for imdb_id in new_ids if imdb_id not in catalogue]
+
+
+def fetch_tmdb_titles(catalogue, missing, on_result=None):
+    """Haal de ontbrekende titels parallel op via de async pipeline en zet ze in catalogue en cache.
+
+    Titels die TMDb niet kent blijven als {} staan, zodat ze niet opnieuw opgezocht worden.
+    Titels die op het OMDb-quotum wachten of door een fout mislukten blijven weg uit
+    catalogue en cache, zodat een volgende run ze opnieuw probeert; geeft hun aantal terug.
+    Titels waarvan de RT-score ontbreekt (rt_pending) komen wel in catalogue, niet in de cache.
+    """
+    fetched = run_enrichment(missing, "tmdb", on_result=on_result, retry_errors=True) if missing else []
+    new_records = {}
+    deferred = 0
+    for imdb_id, data in zip(missing, fetched):
+        if data is None:
+            deferred += 1  # Uitgesteld (OMDb-quotum of fout): bij een volgende run opnieuw proberen
+            continue
+        rt_pending = data.pop("rt_pending", False)
+        catalogue[imdb_id] = data
+        if data and not rt_pending:  # Zonder RT-score niet 30 dagen vastleggen
+            new_records[f"tmdb:{imdb_id}"] = json.dumps(data)
+    try:
+        get_local_cache().set_many(new_records, CACHE_TTL_SECONDS)
+    except Exception as e:
+        print(f"Schrijffout lokale cache: {e}")
+    return deferred
@@ -0,0 +1,134 @@
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from enrichment import api_concurrency
+from http_client import http_get, http_pool_size
+
+# ------------------------------
+# 🔭 TMDb discover: alle pagina's parallel, met datumvensters voorbij de paginalimiet
+# ------------------------------
+# Pagina 1 van een datumbereik geeft total_pages; de overige pagina's gaan daarna
+# tegelijk de deur uit. TMDb levert niet meer dan 500 pagina's per zoekvraag: heeft een
+# bereik er meer, dan wordt het opgeknipt in maanden, een te volle maand in weken en
+# een te volle week in dagen, en elk venster apart (ook parallel) opgehaald.
+# Geen st-calls: dit draait deels in worker-threads, fouten komen terug als tekst.
+
+DISCOVER_URL = "https://api.themoviedb.org/3/discover/movie"
+TMDB_MAX_PAGES = 500
+
+
+def split_window(start, end):
+    """Deel [start, end] op in maanden; binnen één maand in weken, binnen een week in dagen"""
+    if (start.year, start.month) != (end.year, end.month):
+        windows = []
+        while start <= end:
+            month_end = date(start.year, start.month, calendar.monthrange(start.year, start.month)[1])
+            windows.append((start, min(month_end, end)))
+            start = month_end + timedelta(days=1)
+        return windows
+    step = timedelta(days=7 if (end - start).days >= 7 else 1)
+    windows = []
+    while start <= end:
+        windows.append((start, min(start + step - timedelta(days=1), end)))
+        start += step
+    return windows
+
+
+def fetch_discover_page(params, window, page):
+    """Eén discover-pagina voor een datumvenster; geeft (data, fout) terug"""
+    start, end = window
+    page_params = dict(params)
+    page_params.update({
+        "primary_release_date.gte": start.isoformat(),
+        "primary_release_date.lte": end.isoformat(),
+        "page": page,
+    })
+    try:
+        resp = http_get(DISCOVER_URL, params=page_params)
+        resp.raise_for_status()
+        return resp.json(), None
+    except Exception as e:
+        return None, f"Fout bij ophalen films ({start} t/m {end}, pagina {page}): {e}"
+
+
+def discover_movies(params, start, end, max_pages=None):
+    """Alle discover-resultaten tussen start en end (datums); geeft (films, fouten) terug.
+
+    Met max_pages worden per bereik hooguit zoveel pagina's gelezen en wordt er niet
+    opgeknipt. Films staan per venster en daarbinnen in de volgorde van TMDb (sort_by),
+    zonder dubbels.
+    """
+    pages = {}
+    errors = []
+    windows = [(start, end)]
+    with ThreadPoolExecutor(max_workers=max(1, min(api_concurrency()["tmdb"], http_pool_size()))) as executor:
+        while windows:
+            first_pages = list(executor.map(lambda window: fetch_discover_page(params, window, 1), windows))
+            split, jobs = [], []
+            for window, (data, error) in zip(windows, first_pages):
+                if error:
+                    errors.append(error)
+                    continue
+                total_pages = data.get("total_pages", 0)
+                if max_pages is None and total_pages > TMDB_MAX_PAGES and window[0] < window[1]:
+                    split.extend(split_window(*window))  # Te veel pagina's: opnieuw per kleiner venster
+                    continue
+                pages[(window[0], 1)] = data.get("results", [])
+                last_page = min(total_pages, TMDB_MAX_PAGES, max_pages or TMDB_MAX_PAGES)
+                jobs.extend((window, page) for page in range(2, last_page + 1))
+
+            for (window, page), (data, error) in zip(
+                jobs, executor.map(lambda job: fetch_discover_page(params, *job), jobs)
+            ):
+                if error:
+                    errors.append(error)
+                else:
+                    pages[(window[0], page)] = data.get("results", [])
+            windows = split
+
+    movies, seen_ids = [], set()
+    for key in sorted(pages):
+        for movie in pages[key]:
+            if movie.get("id") not in seen_ids:
+                seen_ids.add(movie.get("id"))
+                movies.append(movie)
+    return movies, errors
+
+
+def fill_english_overviews(movies, params, start, end, max_pages=None):
+    """Vul lege (Nederlandse) beschrijvingen aan uit een en-US discover-pass; geeft de fouten terug.
+
+    Eén parallelle crawl over hetzelfde bereik in plaats van een detail-call per titel.
+    """
+    if all(movie.get("overview") for movie in movies):
+        return []
+    english, errors = discover_movies({**params, "language": "en-US"}, start, end, max_pages)
+    overviews = {movie.get("id"): movie.get("overview") for movie in english}
+    for movie in movies:
+        if not movie.get("overview") and overviews.get(movie.get("id")):
+            movie["overview"] = overviews[movie.get("id")]
+    return errors
+
+
+# ------------------------------
+# 🏷️ Genres: namen -> TMDb genre-ID's (voor with_genres)
+# ------------------------------
+GENRE_LIST_URL = "https://api.themoviedb.org/3/genre/movie/list"
+GENRE_LANGUAGES = ("nl-NL", "en-US")
+
+
+def fetch_movie_genres(api_key):
+    """{genrenaam in kleine letters: genre-ID}, met de Nederlandse én de Engelse namen"""
+    genres = {}
+    for language in GENRE_LANGUAGES:
+        resp = http_get(GENRE_LIST_URL, params={"api_key": api_key, "language": language})
+        resp.raise_for_status()
+        for genre in resp.json().get("genres", []):
+            genres[genre["name"].lower()] = genre["id"]
+    return genres
+
+
+def genre_ids(genres, names):
+    """Gesorteerde ID's van de namen die TMDb kent (onbekende namen vallen weg)"""
+    return sorted({genres[name.lower()] for name in names if name.lower() in genres})
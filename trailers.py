@@ -0,0 +1,89 @@
+import re
+import requests
+from http_stream import scan_stream
+from sqlite_cache import get_local_cache
+
+# ------------------------------
+# 🎥 Trailers: YouTube-zoekopdracht met permanente (ook negatieve) cache
+# ------------------------------
+TRAILER_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 dagen
+TRAILER_MISS_TTL_SECONDS = 3 * 24 * 60 * 60  # 3 dagen: misschien verschijnt er later nog een trailer
+NO_TRAILER = ""  # Marker in de cache voor "gezocht, niets gevonden"
+
+
+YOUTUBE_VIDEO_PATTERN = re.compile(r'watch\?v=(\S{11})')
+YOUTUBE_MAX_BYTES = 1536 * 1024  # Byte-budget voor de zoekresultatenpagina
+YOUTUBE_KEEP_CHARS = 64  # Genoeg om een half binnengekomen "watch?v=..." niet te missen
+
+
+def scan_for_video(buffer, eof):
+    match = YOUTUBE_VIDEO_PATTERN.search(buffer)
+    if match:
+        return f"https://www.youtube.com/watch?v={match.group(1)}"
+    return None
+
+
+def lookup_youtube_trailer(title, year):
+    """Zoek de eerste YouTube-video; gooit een exception bij netwerkfouten.
+
+    De pagina wordt gestreamd en de verbinding sluit bij de eerste `watch?v=`-match.
+    """
+    query = f"{title} {year} official trailer site:youtube.com"
+    search_url = f"https://www.youtube.com/results?search_query={requests.utils.quote(query)}"
+    headers = {"User-Agent": "Mozilla/5.0"}
+    return scan_stream(
+        search_url, scan_for_video, YOUTUBE_MAX_BYTES, YOUTUBE_KEEP_CHARS, headers=headers, timeout=15
+    )
+
+
+def trailer_from_tmdb_videos(videos):
+    """Eerste YouTube-trailer uit de TMDb `videos`-resultaten, of None"""
+    for video in videos or []:
+        if video.get("type") == "Trailer" and video.get("site") == "YouTube" and video.get("key"):
+            return f"https://www.youtube.com/watch?v={video['key']}"
+    return None
+
+
+def trailer_cache_keys(title, year, imdb_id=None):
+    keys = [f"trailer:{imdb_id}"] if imdb_id else []
+    if title:
+        keys.append(f"trailer:{title}:{year}")
+    return keys
+
+
+def remember_trailer(trailer_url, imdb_id=None, title=None, year=None):
+    """Bewaar een trailer die elders al gevonden is (bv. via TMDb) zodat andere pagina's hem hergebruiken"""
+    keys = trailer_cache_keys(title, year, imdb_id)
+    if not trailer_url or not keys:
+        return
+    try:
+        get_local_cache().set_many({key: trailer_url for key in keys}, TRAILER_TTL_SECONDS)
+    except Exception as e:
+        print(f"Schrijffout trailer-cache voor {keys[0]}: {e}")
+
+
+def find_youtube_trailer(title, year, imdb_id=None):
+    """Trailer-URL op IMDb ID (met titel/jaar als fallback); alleen bij een misser wordt YouTube doorzocht"""
+    keys = trailer_cache_keys(title, year, imdb_id)
+    cache = get_local_cache()
+    try:
+        cached = cache.get_many(keys)
+    except Exception as e:
+        print(f"Leesfout trailer-cache voor {keys[0] if keys else title}: {e}")
+        cached = {}
+    for key in keys:
+        if key in cached:
+            return cached[key] or None
+
+    try:
+        trailer_url = lookup_youtube_trailer(title, year)
+    except Exception:
+        # Netwerkfout: niet negatief cachen, volgende keer opnieuw proberen
+        return None
+
+    ttl = TRAILER_TTL_SECONDS if trailer_url else TRAILER_MISS_TTL_SECONDS
+    try:
+        cache.set_many({key: trailer_url or NO_TRAILER for key in keys}, ttl)
+    except Exception as e:
+        print(f"Schrijffout trailer-cache voor {keys[0] if keys else title}: {e}")
+    return trailer_url
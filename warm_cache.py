@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from enrichment import api_concurrency, omdb_api_key, tmdb_api_key
+from imdb_ids import extract_imdb_ids
+from omdb_cache import (
+    FRESH_TTL_SECONDS, MemoryLRUCache, connect_cache_backends, memory_cache_max_items, refresh_movie, run_import,
+)
+from omdb_quota import get_omdb_scheduler
+from parental_guide import load_sex_nudity_rating
+from tmdb_cache import cached_tmdb_catalogue, fetch_tmdb_titles
+from trailers import find_youtube_trailer
+
+# Cache-warmer zonder Streamlit: vult dezelfde caches als de pagina's (Upstash/SQLite
+# voor OMDb, SQLite voor TMDb, parental guide en trailers), zodat gebruikers op een
+# warme cache landen. Bedoeld voor cron, bv. elke nacht:
+#   python warm_cache.py watchlist.csv favorieten.csv
+#   python warm_cache.py --sources omdb --no-extras watchlist.csv
+# Exitcode 0 als alles binnen is, 1 als er titels wachten op het OMDb-quotum of
+# fouten waren (een volgende run gaat verder waar deze stopte), 2 bij verkeerd gebruik.
+
+SOURCES = ("omdb", "tmdb")
+PROGRESS_EVERY = 100
+
+
+def read_imdb_ids(paths):
+    """Unieke IMDb ID's uit alle CSV's, in volgorde van voorkomen"""
+    imdb_ids = {}
+    for path in paths:
+        with open(path, "rb") as csv_file:
+            for imdb_id in extract_imdb_ids(csv_file):
+                imdb_ids.setdefault(imdb_id, None)
+    return list(imdb_ids)
+
+
+def progress_printer(label, total):
+    done = [0]
+
+    def advance(count=1):
+        before = done[0]
+        done[0] = min(total, done[0] + count)
+        if done[0] == total or done[0] // PROGRESS_EVERY > before // PROGRESS_EVERY:
+            print(f"{label}: {done[0]}/{total}", flush=True)
+
+    return advance
+
+
+def warm_omdb(imdb_ids, memory_cache):
+    """Zelfde bulk-import als de OMDb-pagina (met checkpoints); verouderde titels meteen verversen"""
+    digest = hashlib.sha256("\n".join(imdb_ids).encode()).hexdigest()
+    movies, report = run_import(imdb_ids, f"cli:{digest}", memory_cache, progress_printer("OMDb", len(imdb_ids)))
+    refreshed = 0
+    if report["stale_ids"]:
+        with ThreadPoolExecutor(max_workers=api_concurrency()["omdb"]) as executor:
+            refreshed = sum(executor.map(lambda imdb_id: refresh_movie(imdb_id, memory_cache), report["stale_ids"]))
+    for err in report["errors"][:5]:
+        print(f"  ⚠️ {err}")
+    print(
+        f"OMDb: {len(movies)} titels in de cache, {report['new']} nieuw, "
+        f"{refreshed}/{len(report['stale_ids'])} verouderde ververst, {report['deferred']} wachten op het quotum, "
+        f"{report['failed']} mislukt"
+    )
+    titles = {imdb_id: (movie.get("Title"), movie.get("Year")) for imdb_id, movie in movies}
+    return titles, report["deferred"] + report["failed"] + len(report["errors"])
+
+
+def warm_tmdb(imdb_ids):
+    catalogue, missing = cached_tmdb_catalogue(imdb_ids)
+    advance = progress_printer("TMDb", len(missing))
+    deferred = fetch_tmdb_titles(catalogue, missing, on_result=lambda index, imdb_id, data: advance())
+    print(f"TMDb: {sum(1 for data in catalogue.values() if data)} titels in de cache, {len(missing)} opgehaald, {deferred} uitgesteld of mislukt")
+    titles = {imdb_id: (data.get("title"), data.get("year")) for imdb_id, data in catalogue.items() if data}
+    return titles, deferred
+
+
+def warm_extras(titles):
+    """Parental guide en trailer per titel; beide hebben hun eigen permanente cache"""
+    def warm(item):
+        imdb_id, (title, year) = item
+        try:
+            load_sex_nudity_rating(imdb_id)
+            find_youtube_trailer(title, year, imdb_id)
+            return True
+        except Exception as e:
+            print(f"Extra's mislukt voor {imdb_id}: {e}")
+            return False
+
+    advance = progress_printer("Extra's", len(titles))
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, api_concurrency()["scrapers"])) as executor:
+        for succeeded in executor.map(warm, titles.items()):
+            failed += not succeeded
+            advance()
+    print(f"Extra's: {len(titles) - failed}/{len(titles)} titels")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vul de OMDb-, TMDb-, parental guide- en trailer-caches vanuit CSV's")
+    parser.add_argument("csv", nargs="+", help="CSV-bestanden met IMDb ID's (watchlist-export of elke CSV)")
+    parser.add_argument("--sources", default=",".join(SOURCES), help="komma-gescheiden: omdb,tmdb (standaard beide)")
+    parser.add_argument("--no-extras", action="store_true", help="parental guide en trailers overslaan")
+    args = parser.parse_args(argv)
+
+    sources = [source.strip() for source in args.sources.split(",") if source.strip()]
+    unknown = [source for source in sources if source not in SOURCES]
+    if unknown or not sources:
+        parser.error(f"onbekende bron(nen): {', '.join(unknown) or '(leeg)'}")
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    try:
+        imdb_ids = read_imdb_ids(args.csv)
+    except OSError as e:
+        parser.error(str(e))
+    print(f"{len(imdb_ids)} unieke IMDb ID's in {len(args.csv)} bestand(en)")
+    if not imdb_ids:
+        return 0
+
+    cache_status = connect_cache_backends()
+    if cache_status["error"]:
+        print(f"❌ Fout bij initialiseren Upstash verbinding: {cache_status['error']}")
+    layers = [name for name, active in (("Upstash Redis", cache_status["redis"]), ("SQLite", cache_status["sqlite"])) if active]
+    print(f"Cachelagen: {' + '.join(layers)}")
+
+    titles = {}
+    pending = 0
+    if "omdb" in sources:
+        if omdb_api_key():
+            omdb_titles, omdb_pending = warm_omdb(imdb_ids, MemoryLRUCache(memory_cache_max_items(), FRESH_TTL_SECONDS))
+            titles.update(omdb_titles)
+            pending += omdb_pending
+        else:
+            print("⚠️ Geen OMDB_API_KEY: OMDb overgeslagen")
+    if "tmdb" in sources:
+        if tmdb_api_key():
+            tmdb_titles, tmdb_pending = warm_tmdb(imdb_ids)
+            for imdb_id, title_year in tmdb_titles.items():
+                titles.setdefault(imdb_id, title_year)
+            pending += tmdb_pending
+        else:
+            print("⚠️ Geen TMDB_API_KEY: TMDb overgeslagen")
+    if not args.no_extras and titles:
+        pending += warm_extras(titles)
+
+    if omdb_api_key():
+        stats = get_omdb_scheduler(omdb_api_key()).stats()
+        print(f"OMDb-quotum: {stats['used']}/{stats['quota']} calls vandaag")
+    return 1 if pending else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())